@@ -14,14 +14,53 @@ See [Phantom](https://github.com/danieljprice/phantom/) for details on Phantom.
 Daniel Mentiplay, 2019-2021.
 """
 
-from pathlib import Path
-from typing import Dict, Union
+from __future__ import annotations
 
-from .generators import parameter_sweep
-from .phantomconfig import PhantomConfig
+from typing import TYPE_CHECKING, Any, Dict, List, Union
 
+from .phantomconfig import PhantomConfig
 
-def read_dict(dictionary: Dict, dtype: str = None) -> PhantomConfig:
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from .chain import ChainConfig, merge
+    from .generators import parameter_sweep, sweep_points
+    from .manifest import materialize
+    from .samplers import Range
+    from .templates import compile_template
+
+# Names imported from submodules on first use, so that importing
+# phantomconfig only imports what is needed to read and write configs.
+_LAZY_NAMES = {
+    'ChainConfig': 'chain',
+    'Range': 'samplers',
+    'compile_template': 'templates',
+    'materialize': 'manifest',
+    'merge': 'chain',
+    'parameter_sweep': 'generators',
+    'sweep_points': 'generators',
+}
+_SUBMODULES = (
+    'aio',
+    'chain',
+    'export',
+    'expressions',
+    'generators',
+    'manifest',
+    'memory',
+    'samplers',
+    'schema',
+    'shared',
+    'snapshot',
+    'templates',
+    'validation',
+    'watch',
+)
+
+
+def read_dict(
+    dictionary: Dict, dtype: str = None, keep_comments: bool = True
+) -> PhantomConfig:
     """Initialize PhantomConfig from a dictionary.
 
     Parameters
@@ -37,6 +76,8 @@ def read_dict(dictionary: Dict, dtype: str = None) -> PhantomConfig:
     dtype
         The dictionary type: either 'nested' or 'flat'. The default is
         'nested'.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
 
     Returns
     -------
@@ -45,57 +86,126 @@ def read_dict(dictionary: Dict, dtype: str = None) -> PhantomConfig:
     """
     if dtype is None:
         dtype = 'nested'
-    return PhantomConfig(dictionary=dictionary, dictionary_type=dtype)
+    return PhantomConfig(
+        dictionary=dictionary, dictionary_type=dtype, keep_comments=keep_comments
+    )
 
 
-def read_config(filename: Union[str, Path]) -> PhantomConfig:
+def read_config(
+    filename: Union[str, Path], keep_comments: bool = True
+) -> PhantomConfig:
     """Initialize PhantomConfig from a Phantom config file.
 
     Parameters
     ----------
     filename
         The Phantom config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
 
     Returns
     -------
     PhantomConfig
         Generated from the file.
     """
-    return PhantomConfig(filename=filename, filetype='phantom')
+    return PhantomConfig(
+        filename=filename, filetype='phantom', keep_comments=keep_comments
+    )
 
 
-def read_json(filename: Union[str, Path]) -> PhantomConfig:
+def read_json(filename: Union[str, Path], keep_comments: bool = True) -> PhantomConfig:
     """Initialize PhantomConfig from a JSON config file.
 
     Parameters
     ----------
     filename
         The JSON config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
 
     Returns
     -------
     PhantomConfig
         Generated from the file.
     """
-    return PhantomConfig(filename=filename, filetype='json')
+    return PhantomConfig(
+        filename=filename, filetype='json', keep_comments=keep_comments
+    )
 
 
-def read_toml(filename: Union[str, Path]) -> PhantomConfig:
+def read_toml(filename: Union[str, Path], keep_comments: bool = True) -> PhantomConfig:
     """Initialize PhantomConfig from a TOML config file.
 
     Parameters
     ----------
     filename
         The TOML config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
 
     Returns
     -------
     PhantomConfig
         Generated from the file.
     """
-    return PhantomConfig(filename=filename, filetype='toml')
+    return PhantomConfig(
+        filename=filename, filetype='toml', keep_comments=keep_comments
+    )
 
 
-__all__ = ['parameter_sweep', 'read_config', 'read_dict', 'read_json', 'read_toml']
+def read_binary(
+    filename: Union[str, Path], keep_comments: bool = True
+) -> PhantomConfig:
+    """Initialize PhantomConfig from a binary config file.
+
+    Parameters
+    ----------
+    filename
+        The binary config file, as from PhantomConfig.write_binary.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
+
+    Returns
+    -------
+    PhantomConfig
+        Generated from the file.
+    """
+    return PhantomConfig(
+        filename=filename, filetype='binary', keep_comments=keep_comments
+    )
+
+
+__all__ = [
+    'ChainConfig',
+    'Range',
+    'compile_template',
+    'materialize',
+    'merge',
+    'parameter_sweep',
+    'read_binary',
+    'read_config',
+    'read_dict',
+    'read_json',
+    'read_toml',
+    'sweep_points',
+]
 
 __version__ = '0.3.4'
+
+
+def __getattr__(name: str) -> Any:
+    """Import names and submodules on first use."""
+    from importlib import import_module
+
+    if name in _LAZY_NAMES:
+        value = getattr(import_module(f'.{_LAZY_NAMES[name]}', __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return import_module(f'.{name}', __name__)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> List[str]:
+    """List the names in the module, including those not imported yet."""
+    return sorted(set(globals()) | set(_LAZY_NAMES) | set(_SUBMODULES))
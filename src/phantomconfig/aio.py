@@ -0,0 +1,415 @@
+"""Read and write config files from asyncio code.
+
+The functions in this module mirror the blocking functions in
+phantomconfig, but run file I/O, parsing, and rendering in an executor
+so they do not stall the event loop.
+
+By default the work runs in a module-level thread pool. Its size is set
+with set_max_workers. Any function also accepts an explicit executor,
+e.g. a concurrent.futures.ProcessPoolExecutor.
+
+Examples
+--------
+>>> from phantomconfig import aio
+>>> config = await aio.read_config('prefix.in')
+>>> config.change_value('tmax', 10.0)
+>>> await aio.write_phantom(config, 'new.in')
+"""
+
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from .generators import (
+    _BATCH_SIZE,
+    SweepResult,
+    _batched,
+    _make_writer,
+    _render_files,
+    _sweep_templates,
+    _validate_points,
+    _write_manifest,
+    sweep_points,
+)
+from .phantomconfig import PhantomConfig
+from .validation import Validator
+
+_executor: Optional[ThreadPoolExecutor] = None
+_max_workers: Optional[int] = None
+
+
+def set_max_workers(max_workers: Optional[int]) -> None:
+    """Set the number of threads in the default executor.
+
+    Parameters
+    ----------
+    max_workers
+        The maximum number of threads. If None, use the
+        concurrent.futures default.
+    """
+    global _executor, _max_workers
+    if max_workers is not None and max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    _max_workers = max_workers
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Get the default executor, creating it if required."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=_max_workers, thread_name_prefix='phantomconfig'
+        )
+    return _executor
+
+
+async def _run(func: Callable, *args: Any, executor: Executor = None, **kwargs):
+    """Run a blocking function in an executor."""
+    if executor is None:
+        executor = _get_executor()
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(func, *args, **kwargs))
+
+
+async def read_config(
+    filename: Union[str, Path], *, keep_comments: bool = True, executor: Executor = None
+) -> PhantomConfig:
+    """Initialize PhantomConfig from a Phantom config file.
+
+    Parameters
+    ----------
+    filename
+        The Phantom config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
+    executor
+        The executor to run in. Default is the module thread pool.
+
+    Returns
+    -------
+    PhantomConfig
+        Generated from the file.
+    """
+    return await _run(
+        PhantomConfig,
+        filename=filename,
+        filetype='phantom',
+        keep_comments=keep_comments,
+        executor=executor,
+    )
+
+
+async def read_json(
+    filename: Union[str, Path], *, keep_comments: bool = True, executor: Executor = None
+) -> PhantomConfig:
+    """Initialize PhantomConfig from a JSON config file.
+
+    Parameters
+    ----------
+    filename
+        The JSON config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
+    executor
+        The executor to run in. Default is the module thread pool.
+
+    Returns
+    -------
+    PhantomConfig
+        Generated from the file.
+    """
+    return await _run(
+        PhantomConfig,
+        filename=filename,
+        filetype='json',
+        keep_comments=keep_comments,
+        executor=executor,
+    )
+
+
+async def read_toml(
+    filename: Union[str, Path], *, keep_comments: bool = True, executor: Executor = None
+) -> PhantomConfig:
+    """Initialize PhantomConfig from a TOML config file.
+
+    Parameters
+    ----------
+    filename
+        The TOML config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
+    executor
+        The executor to run in. Default is the module thread pool.
+
+    Returns
+    -------
+    PhantomConfig
+        Generated from the file.
+    """
+    return await _run(
+        PhantomConfig,
+        filename=filename,
+        filetype='toml',
+        keep_comments=keep_comments,
+        executor=executor,
+    )
+
+
+async def read_binary(
+    filename: Union[str, Path], *, keep_comments: bool = True, executor: Executor = None
+) -> PhantomConfig:
+    """Initialize PhantomConfig from a binary config file.
+
+    Parameters
+    ----------
+    filename
+        The binary config file.
+    keep_comments
+        If False, drop the comments to save memory. Default is True.
+    executor
+        The executor to run in. Default is the module thread pool.
+
+    Returns
+    -------
+    PhantomConfig
+        Generated from the file.
+    """
+    return await _run(
+        PhantomConfig,
+        filename=filename,
+        filetype='binary',
+        keep_comments=keep_comments,
+        executor=executor,
+    )
+
+
+async def write_phantom(
+    config: PhantomConfig, filename: Union[str, Path], *, executor: Executor = None
+) -> PhantomConfig:
+    """Write config to Phantom config file.
+
+    Parameters
+    ----------
+    config
+        The config to write.
+    filename
+        The name of the Phantom output file.
+    executor
+        The executor to run in. Default is the module thread pool.
+    """
+    await _run(config.write_phantom, filename, executor=executor)
+    return config
+
+
+async def write_json(
+    config: PhantomConfig, filename: Union[str, Path], *, executor: Executor = None
+) -> PhantomConfig:
+    """Write config to JSON file.
+
+    Parameters
+    ----------
+    config
+        The config to write.
+    filename
+        The name of the JSON output file.
+    executor
+        The executor to run in. Default is the module thread pool.
+    """
+    await _run(config.write_json, filename, executor=executor)
+    return config
+
+
+async def write_toml(
+    config: PhantomConfig, filename: Union[str, Path], *, executor: Executor = None
+) -> PhantomConfig:
+    """Write config to TOML file.
+
+    Parameters
+    ----------
+    config
+        The config to write.
+    filename
+        The name of the TOML output file.
+    executor
+        The executor to run in. Default is the module thread pool.
+    """
+    await _run(config.write_toml, filename, executor=executor)
+    return config
+
+
+async def write_binary(
+    config: PhantomConfig, filename: Union[str, Path], *, executor: Executor = None
+) -> PhantomConfig:
+    """Write config to binary file.
+
+    Parameters
+    ----------
+    config
+        The config to write.
+    filename
+        The name of the binary output file.
+    executor
+        The executor to run in. Default is the module thread pool.
+    """
+    await _run(config.write_binary, filename, executor=executor)
+    return config
+
+
+async def parameter_sweep(
+    *,
+    filename: str = None,
+    template: PhantomConfig = None,
+    parameters: Dict[str, List[Any]],
+    dummy_parameters: List[str] = None,
+    dependent_parameters: Dict[str, List[Dict[str, Any]]] = None,
+    derived_parameters: Dict[str, Union[str, Callable]] = None,
+    prefix: str = None,
+    output_dir: Union[str, Path] = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    incremental: bool = False,
+    fsync: str = 'none',
+    sampler: str = None,
+    n_samples: int = None,
+    seed: int = None,
+    constraints: List[Union[str, Callable]] = None,
+    archive: Union[str, Path] = None,
+    templates: Dict[str, Tuple[PhantomConfig, List[str]]] = None,
+    dedupe: str = None,
+    validator: Validator = None,
+    manifest: Union[str, Path] = None,
+    max_concurrency: int = 4,
+    executor: Executor = None,
+) -> SweepResult:
+    """Generate Phantom files in a parameter sweep.
+
+    See phantomconfig.parameter_sweep for a description of the sweep
+    arguments. Batches of points are rendered in the executor in turn,
+    and up to max_concurrency batches are written concurrently.
+
+    Parameters
+    ----------
+    incremental
+        If True, only write files whose contents have changed.
+    fsync
+        When to flush files to disk: 'none', 'file', or 'end'.
+    archive
+        If set, write every file into this single archive.
+    templates
+        A dict of {filename: (template, dummy_parameters)} to generate
+        several files for each point in one pass.
+    dedupe
+        If 'hardlink' or 'symlink', write each distinct file once and
+        link it into place.
+    validator
+        If set, validate every point before any file is written.
+    manifest
+        If set, write a manifest table and the templates instead of a
+        directory per point.
+    max_concurrency
+        The maximum number of batches of files being written at once.
+    executor
+        The executor to run in. Default is the module thread pool. The
+        template and writer are shared between calls, so this must be a
+        thread-based executor.
+    """
+    if max_concurrency < 1:
+        raise ValueError('max_concurrency must be at least 1')
+    _templates, dummy_parameters = _sweep_templates(
+        parameters,
+        filename,
+        template,
+        dummy_parameters,
+        templates,
+        dependent_parameters,
+        derived_parameters,
+    )
+    points = sweep_points(
+        parameters=parameters,
+        dummy_parameters=dummy_parameters,
+        dependent_parameters=dependent_parameters,
+        derived_parameters=derived_parameters,
+        prefix=prefix,
+        shard_index=shard_index,
+        shard_count=shard_count,
+        sampler=sampler,
+        n_samples=n_samples,
+        seed=seed,
+        constraints=constraints,
+    )
+    if validator is not None:
+        points = await _run(
+            _validate_points,
+            validator,
+            points,
+            template,
+            templates,
+            executor=executor,
+        )
+    if manifest is not None:
+        return await _run(
+            _write_manifest,
+            manifest,
+            output_dir,
+            template,
+            templates,
+            filename,
+            dummy_parameters,
+            points,
+            incremental,
+            fsync,
+            archive,
+            dedupe,
+            executor=executor,
+        )
+    writer = await _run(
+        _make_writer,
+        output_dir,
+        archive,
+        incremental,
+        fsync,
+        dedupe,
+        executor=executor,
+    )
+    batches = _batched(_render_files(_templates, points), _BATCH_SIZE)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks: Set[asyncio.Future] = set()
+    errors: List[BaseException] = list()
+
+    async def _write(batch: List[Tuple[str, bytes]]) -> None:
+        try:
+            await _run(writer.write, batch, executor=executor)
+        except BaseException as error:
+            errors.append(error)
+            raise
+        finally:
+            semaphore.release()
+
+    try:
+        while True:
+            batch = await _run(next, batches, None, executor=executor)
+            if batch is None:
+                break
+            await semaphore.acquire()
+            if errors:
+                break
+            task: asyncio.Future = asyncio.ensure_future(_write(batch))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+        if errors:
+            raise errors[0]
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await _run(writer.abort, executor=executor)
+        raise
+
+    return await _run(writer.close, executor=executor)
@@ -0,0 +1,234 @@
+"""Stack partial override configs on top of a base config.
+
+A ChainConfig resolves each variable through a stack of layers, from the
+last override down to the base config, without copying any of them. Use
+flatten to get a PhantomConfig once it is needed, e.g. to write it.
+
+Examples
+--------
+>>> import phantomconfig as pc
+>>> site = pc.read_config('site.in')
+>>> project = pc.merge(site, 'project.json')
+>>> run = project.new_child({'tmax': 200.0})
+>>> run.get_value('tmax')
+200.0
+>>> run.flatten().write_phantom('run.in')
+"""
+
+from collections.abc import Mapping
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple, Union
+
+from .phantomconfig import ConfigVariable, PhantomConfig
+
+if TYPE_CHECKING:
+    from .memory import MemoryUsage
+
+Override = Union[PhantomConfig, Dict[str, Any], str, Path]
+
+_FILETYPES = {'.json': 'json', '.toml': 'toml', '.bin': 'binary'}
+
+
+class ChainConfig(Mapping):
+    """A base config with layers of overrides, resolved lazily.
+
+    ChainConfig is a read-only mapping like {'variable': ConfigVariable}.
+    A variable takes its value from the last layer which sets it. A
+    variable set by a dict of values keeps the comment and block of the
+    layer below it.
+
+    The layers are not copied, so changes to the base config or to an
+    override are seen by the ChainConfig.
+
+    Parameters
+    ----------
+    base
+        The base config. Its header and datetime are used for the
+        ChainConfig.
+    *overrides
+        The layers of overrides, from lowest to highest priority. Each is
+        a PhantomConfig, which may have only some variables, a dict of
+        values like {'variable': value, ...}, or the path of a config
+        file. Files ending in .json, .toml, or .bin are read in those
+        formats, and other files as Phantom config files.
+    """
+
+    def __init__(self, base: PhantomConfig, *overrides: Override) -> None:
+        self.base = base
+        self.layers: List[Tuple[Dict[str, Any], bool]] = [(base.config, True)]
+        for override in overrides:
+            self.layers.append(self._make_layer(override))
+
+    def _make_layer(self, override: Override) -> Tuple[Dict[str, Any], bool]:
+        """Convert an override to a layer.
+
+        A layer is a dict and whether its items are ConfigVariables, or
+        else only values.
+        """
+        if isinstance(override, (str, Path)):
+            path = Path(override)
+            override = PhantomConfig(
+                filename=path, filetype=_FILETYPES.get(path.suffix, 'phantom')
+            )
+        if isinstance(override, PhantomConfig):
+            return override.config, True
+        if not isinstance(override, dict):
+            raise TypeError('override must be a PhantomConfig, dict, or file path')
+        errors = list()
+        for variable, value in override.items():
+            if variable in self and not isinstance(
+                value, type(self.get_value(variable))
+            ):
+                errors.append(f'{variable}: value and variable are not compatible')
+        if errors:
+            raise ValueError('; '.join(errors))
+        return override, False
+
+    def new_child(self, override: Override) -> 'ChainConfig':
+        """Get a new ChainConfig with another layer of overrides on top.
+
+        The existing layers are shared with the new ChainConfig, not
+        copied.
+
+        Parameters
+        ----------
+        override
+            The override, as in ChainConfig.
+
+        Returns
+        -------
+        ChainConfig
+            The new ChainConfig.
+        """
+        child = ChainConfig.__new__(ChainConfig)
+        child.base = self.base
+        child.layers = list(self.layers)
+        child.layers.append(child._make_layer(override))
+        return child
+
+    def __getitem__(self, variable: str) -> ConfigVariable:
+        """Get a variable from the highest layer which sets it."""
+        value_layer = None
+        for layer, full in reversed(self.layers):
+            if variable not in layer:
+                continue
+            if full:
+                if value_layer is None:
+                    return layer[variable]
+                return layer[variable]._replace(value=value_layer[variable])
+            if value_layer is None:
+                value_layer = layer
+        if value_layer is None:
+            raise KeyError(variable)
+        return ConfigVariable(
+            variable, value_layer[variable], 'No description', 'Miscellaneous'
+        )
+
+    def __contains__(self, variable: object) -> bool:
+        """Check if any layer sets a variable."""
+        return any(variable in layer for layer, _ in self.layers)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the variables, in order of the layer they first appear."""
+        return iter(dict.fromkeys(var for layer, _ in self.layers for var in layer))
+
+    def __len__(self) -> int:
+        """The number of variables."""
+        return len(dict.fromkeys(var for layer, _ in self.layers for var in layer))
+
+    @property
+    def header(self) -> Any:
+        """The header of the base config."""
+        return self.base.header
+
+    @property
+    def datetime(self) -> Any:
+        """The datetime of the base config."""
+        return self.base.datetime
+
+    @property
+    def variables(self) -> List[str]:
+        """List of variables."""
+        return list(self)
+
+    def get_value(self, variable: str) -> Any:
+        """Get the value of a variable.
+
+        Parameters
+        ----------
+        variable
+            The name of the variable.
+
+        Returns
+        -------
+        The value of the variable.
+        """
+        for layer, full in reversed(self.layers):
+            if variable in layer:
+                return layer[variable].value if full else layer[variable]
+        raise KeyError(variable)
+
+    def flatten(self) -> PhantomConfig:
+        """Resolve every variable into a new PhantomConfig.
+
+        Returns
+        -------
+        PhantomConfig
+            A config with the header and datetime of the base config, and
+            the resolved value, comment, and block of each variable.
+        """
+        dictionary: Dict[str, Any] = {
+            variable: [item.value, item.comment, item.block]
+            for variable, item in self.items()
+        }
+        if self.header is not None:
+            dictionary['__header__'] = list(self.header)
+        if self.datetime is not None:
+            dictionary['__datetime__'] = self.datetime
+        return PhantomConfig(dictionary=dictionary, dictionary_type='flat')
+
+    def memory_usage(self, deep: bool = True) -> 'MemoryUsage':
+        """Get the memory used by the layers.
+
+        Objects shared between layers are counted once. See
+        phantomconfig.memory.
+
+        Parameters
+        ----------
+        deep
+            If True, count the names, values, comments, blocks, and
+            header lines. If False, only count the dicts and tuples which
+            hold them. Default is True.
+
+        Returns
+        -------
+        MemoryUsage
+            The memory in bytes of each part of the layers.
+        """
+        from .memory import memory_usage
+
+        return memory_usage([self], deep=deep)
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f'<ChainConfig base={self.base.name!r} layers={len(self.layers)}>'
+
+
+def merge(base: PhantomConfig, *overrides: Override) -> ChainConfig:
+    """Stack override configs on top of a base config.
+
+    Parameters
+    ----------
+    base
+        The base config.
+    *overrides
+        The layers of overrides, from lowest to highest priority: each a
+        PhantomConfig, a dict of values, or the path of a config file.
+        See ChainConfig.
+
+    Returns
+    -------
+    ChainConfig
+        The layered config. Call flatten on it to get a PhantomConfig.
+    """
+    return ChainConfig(base, *overrides)
@@ -0,0 +1,302 @@
+"""Export the configs in a directory tree to one table.
+
+Each config file becomes a row, with a column for the path, the datetime
+and header of the file, and each variable. The files are parsed in
+parallel and the rows are spooled to a temporary file, so only a chunk
+of rows is in memory at once, except for the npz format, which holds
+one array per column.
+
+Examples
+--------
+>>> from phantomconfig.export import export_tree
+>>> export_tree('runs', 'runs.csv')
+>>> import pandas
+>>> df = pandas.read_csv('runs.csv')
+"""
+
+import csv
+import datetime
+import os
+import pickle
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Set, Tuple, Union
+
+from .phantomconfig import PhantomConfig, _convert_timedelta_to_str
+from .watch import SUFFIXES
+
+FORMATS = ('csv', 'parquet', 'npz')
+
+_COLUMNS = ('path', 'datetime', 'header')
+_CHUNK_SIZE = 10000
+
+
+def export_tree(
+    root: Union[str, Path],
+    out: Union[str, Path],
+    format: str = None,
+    *,
+    suffixes: Iterable[str] = SUFFIXES,
+    max_workers: int = None,
+    executor: Executor = None,
+) -> int:
+    """Export every config file under a directory to a table.
+
+    The table has one row per file. The columns are 'path', relative to
+    root, 'datetime' and 'header' of the file, and then one column per
+    variable, in the order they are first found. If a file does not
+    have a variable, its value is empty (csv) or null (parquet). In the
+    npz format, a missing value is NaN, NaT, '', or False, and a column
+    with missing values has a bool array '<name>_missing'.
+
+    Parameters
+    ----------
+    root
+        The directory to search recursively for config files.
+    out
+        The output file.
+    format
+        The output format: 'csv', 'parquet', or 'npz'. Default is from
+        the suffix of out. The parquet format requires pyarrow, and the
+        npz format requires numpy.
+    suffixes
+        The suffixes of the config files. Default is ('.in', '.setup').
+    max_workers
+        The number of processes to parse files with. Default is the
+        number of CPUs. If 1, parse files in this process.
+    executor
+        A concurrent.futures.Executor to parse files with, instead of a
+        new process pool.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    root = Path(root).expanduser().resolve()
+    if not root.is_dir():
+        raise ValueError(f'{root} is not a directory')
+    if format is None:
+        format = Path(out).suffix.lstrip('.').lower()
+    if format not in FORMATS:
+        raise ValueError(f'format must be one of {FORMATS}')
+    if max_workers is not None and max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+
+    paths = [str(path) for path in _find_files(root, tuple(suffixes))]
+    with tempfile.TemporaryFile() as spool:
+        columns = _spool_rows(root, paths, spool, max_workers, executor)
+        spool.seek(0)
+        rows = _read_spool(spool)
+        if format == 'csv':
+            _write_csv(out, columns, rows)
+        elif format == 'parquet':
+            _write_parquet(out, columns, rows)
+        else:
+            _write_npz(out, columns, rows, len(paths))
+    return len(paths)
+
+
+def _find_files(root: Path, suffixes: Tuple[str, ...]) -> Iterator[Path]:
+    """Find the config files under a directory, in sorted order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if filename.endswith(suffixes):
+                yield Path(dirpath) / filename
+
+
+def _read_row(path: str) -> Tuple[Any, Any, Dict[str, Any]]:
+    """Parse a config file into its datetime, header, and values."""
+    try:
+        config = PhantomConfig(filename=path, filetype='phantom')
+    except (OSError, ValueError, IndexError, KeyError) as error:
+        raise ValueError(f'Cannot read {path}: {error}') from error
+    header = '\n'.join(config.header) if config.header is not None else None
+    values = {name: item.value for name, item in config.config.items()}
+    return config.datetime, header, values
+
+
+def _spool_rows(
+    root: Path,
+    paths: List[str],
+    spool: IO[bytes],
+    max_workers: int = None,
+    executor: Executor = None,
+) -> Dict[str, Set[type]]:
+    """Parse files in parallel and write their rows to a spool file.
+
+    Returns the columns in order, with the types of their values.
+    """
+    columns: Dict[str, Set[type]] = {name: set() for name in _COLUMNS}
+    columns['path'].add(str)
+    own_executor = None
+    if executor is None and max_workers != 1 and len(paths) > 1:
+        executor = own_executor = ProcessPoolExecutor(max_workers=max_workers)
+    try:
+        if executor is not None:
+            results: Iterable = executor.map(_read_row, paths, chunksize=64)
+        else:
+            results = map(_read_row, paths)
+        for path, (date_time, header, values) in zip(paths, results):
+            row = {
+                'path': str(Path(path).relative_to(root)),
+                'datetime': date_time,
+                'header': header,
+                **values,
+            }
+            for name, value in row.items():
+                if value is not None:
+                    columns.setdefault(name, set()).add(type(value))
+            pickle.dump(row, spool, protocol=pickle.HIGHEST_PROTOCOL)
+    finally:
+        if own_executor is not None:
+            own_executor.shutdown()
+    return columns
+
+
+def _read_spool(spool: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    """Read the rows back from a spool file."""
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+def _column_kind(types: Set[type]) -> str:
+    """The kind of a column from the types of its values.
+
+    One of 'bool', 'int', 'float', 'datetime', or 'str'. Values of other
+    types, or a mix of types, are exported as str.
+    """
+    if types <= {bool} and types:
+        return 'bool'
+    if types <= {int} and types:
+        return 'int'
+    if types <= {int, float} and types:
+        return 'float'
+    if types == {datetime.datetime}:
+        return 'datetime'
+    return 'str'
+
+
+def _convert(value: Any, kind: str) -> Any:
+    """Convert a value for a column of a kind."""
+    if value is None:
+        return None
+    if kind == 'float':
+        return float(value)
+    if kind == 'str':
+        if isinstance(value, datetime.timedelta):
+            return _convert_timedelta_to_str(value)
+        if isinstance(value, bool):
+            return 'T' if value else 'F'
+        return str(value)
+    return value
+
+
+def _chunks(rows: Iterator[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    """Split rows into chunks."""
+    while True:
+        chunk = list(islice(rows, _CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _write_csv(
+    out: Union[str, Path],
+    columns: Dict[str, Set[type]],
+    rows: Iterator[Dict[str, Any]],
+) -> None:
+    """Write rows to a CSV file."""
+    kinds = {name: _column_kind(types) for name, types in columns.items()}
+    with open(out, mode='w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(columns)
+        for chunk in _chunks(rows):
+            writer.writerows(
+                [_convert(row.get(name), kind) for name, kind in kinds.items()]
+                for row in chunk
+            )
+
+
+def _write_parquet(
+    out: Union[str, Path],
+    columns: Dict[str, Set[type]],
+    rows: Iterator[Dict[str, Any]],
+) -> None:
+    """Write rows to a Parquet file, one row group per chunk."""
+    import pyarrow
+    import pyarrow.parquet
+
+    types = {
+        'bool': pyarrow.bool_(),
+        'int': pyarrow.int64(),
+        'float': pyarrow.float64(),
+        'datetime': pyarrow.timestamp('us'),
+        'str': pyarrow.string(),
+    }
+    kinds = {name: _column_kind(_types) for name, _types in columns.items()}
+    schema = pyarrow.schema([(name, types[kind]) for name, kind in kinds.items()])
+    with pyarrow.parquet.ParquetWriter(str(out), schema) as writer:
+        for chunk in _chunks(rows):
+            arrays = [
+                pyarrow.array(
+                    [_convert(row.get(name), kind) for row in chunk], types[kind]
+                )
+                for name, kind in kinds.items()
+            ]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+
+
+def _write_npz(
+    out: Union[str, Path],
+    columns: Dict[str, Set[type]],
+    rows: Iterator[Dict[str, Any]],
+    size: int,
+) -> None:
+    """Write rows to an npz file, with one array per column.
+
+    No array has dtype object, so the file loads without pickle. Missing
+    values are NaN in float columns, NaT in datetime columns, '' in str
+    columns, and False in bool columns, and int columns with missing
+    values are converted to float. Each column with missing values also
+    has a bool array '<name>_missing'.
+    """
+    import numpy as np
+
+    kinds = {name: _column_kind(types) for name, types in columns.items()}
+    arrays: Dict[str, Any] = dict()
+    for name, kind in kinds.items():
+        if kind == 'float':
+            arrays[name] = np.full(size, np.nan)
+        elif kind == 'int':
+            arrays[name] = np.zeros(size, dtype=np.int64)
+        elif kind == 'bool':
+            arrays[name] = np.zeros(size, dtype=bool)
+        elif kind == 'datetime':
+            arrays[name] = np.full(size, np.datetime64('NaT', 'us'))
+        else:
+            arrays[name] = np.full(size, '', dtype=object)
+    missing = {name: np.zeros(size, dtype=bool) for name in kinds}
+    for idx, row in enumerate(rows):
+        for name, kind in kinds.items():
+            value = _convert(row.get(name), kind)
+            if value is None:
+                missing[name][idx] = True
+            else:
+                arrays[name][idx] = value
+    for name, kind in kinds.items():
+        if kind == 'str':
+            arrays[name] = arrays[name].astype(str)
+        if missing[name].any():
+            if kind == 'int':
+                arrays[name] = arrays[name].astype(float)
+                arrays[name][missing[name]] = np.nan
+            arrays[f'{name}_missing'] = missing[name]
+    with open(out, mode='wb') as fp:
+        np.savez(fp, **arrays)
@@ -0,0 +1,132 @@
+"""Expressions over named parameters."""
+
+import ast
+import inspect
+import math
+import sys
+from typing import Any, Callable, Dict, FrozenSet, Optional, Union
+
+FUNCTIONS: Dict[str, Any] = {
+    'abs': abs,
+    'min': min,
+    'max': max,
+    'round': round,
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'log': math.log,
+    'log10': math.log10,
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'pi': math.pi,
+}
+
+_NODES = (
+    ast.Expression,
+    ast.BoolOp,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.IfExp,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.Tuple,
+    ast.List,
+    ast.operator,
+    ast.unaryop,
+    ast.boolop,
+    ast.cmpop,
+)
+if sys.version_info < (3, 8):
+    _NODES += (ast.Num, ast.Str, ast.NameConstant)
+
+
+class Expression:
+    """A Python expression or callable over named parameters.
+
+    Parameters
+    ----------
+    expression
+        Either a string with a Python expression like 'tmax / 100' or
+        'alpha <= 2 * beta', or a callable. Expressions may use
+        arithmetic, comparisons, boolean operators, conditional
+        expressions, and the functions in FUNCTIONS. A callable is
+        called with the parameters named in its signature as keyword
+        arguments, or with all parameters if it takes **kwargs.
+
+    Attributes
+    ----------
+    names
+        The parameter names used by the expression, or None if it uses
+        all parameters.
+    """
+
+    def __init__(self, expression: Union[str, Callable]) -> None:
+        self.expression = expression
+        self.names: Optional[FrozenSet[str]]
+        if isinstance(expression, str):
+            try:
+                tree = ast.parse(expression.strip(), mode='eval')
+            except SyntaxError:
+                raise ValueError(f'Cannot parse expression: {expression}')
+            for node in ast.walk(tree):
+                if not isinstance(node, _NODES):
+                    raise ValueError(
+                        f'Unsupported syntax {type(node).__name__} in: {expression}'
+                    )
+                if isinstance(node, ast.Call) and not (
+                    isinstance(node.func, ast.Name) and node.func.id in FUNCTIONS
+                ):
+                    raise ValueError(f'Unsupported function call in: {expression}')
+            self.names = frozenset(
+                node.id
+                for node in ast.walk(tree)
+                if isinstance(node, ast.Name) and node.id not in FUNCTIONS
+            )
+            self._code = compile(tree, '<expression>', 'eval')
+            self._function = None
+        elif callable(expression):
+            self._function = expression
+            parameters = inspect.signature(expression).parameters.values()
+            if any(p.kind == p.VAR_KEYWORD for p in parameters):
+                self.names = None
+            else:
+                self.names = frozenset(
+                    p.name
+                    for p in parameters
+                    if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY)
+                )
+        else:
+            raise TypeError('expression must be str or callable')
+
+    def __call__(
+        self, namespace: Dict[str, Any], functions: Dict[str, Any] = None
+    ) -> Any:
+        """Evaluate the expression.
+
+        Parameters
+        ----------
+        namespace
+            A dict of parameter names and values. It must contain all
+            names used by the expression.
+        functions
+            The functions available to a string expression. Default is
+            FUNCTIONS.
+
+        Returns
+        -------
+        The value of the expression.
+        """
+        if self._function is not None:
+            if self.names is None:
+                return self._function(**namespace)
+            return self._function(**{name: namespace[name] for name in self.names})
+        if functions is None:
+            functions = FUNCTIONS
+        return eval(self._code, {'__builtins__': {}}, {**functions, **namespace})
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f'Expression({self.expression!r})'
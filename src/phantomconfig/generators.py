@@ -1,23 +1,79 @@
 """Generate multiple config files."""
 
-from itertools import product
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from collections import namedtuple
+from itertools import islice, product
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
+from .expressions import Expression
+from .manifest import write_manifest
 from .phantomconfig import PhantomConfig
+from .samplers import Range, sample_points
+from .templates import CompiledTemplate, compile_template
+from .validation import Validator, _as_array, _numpy, _numpy_functions
+
+SweepResult = namedtuple('SweepResult', ['created', 'updated', 'unchanged'])
+
+_BATCH_SIZE = 1024
+_FSYNC_POLICIES = ('none', 'file', 'end')
+_RANDOM_SAMPLERS = ('random', 'latin_hypercube')
+_DEDUPE_MODES = (None, 'hardlink', 'symlink')
+_STORE_DIRECTORY = '.store'
+# The values are tarfile modes, which typeshed types as literals.
+_ARCHIVE_MODES: Dict[str, Any] = {
+    '.tar': 'w',
+    '.tar.gz': 'w:gz',
+    '.tgz': 'w:gz',
+    '.tar.bz2': 'w:bz2',
+    '.tar.xz': 'w:xz',
+    '.txz': 'w:xz',
+    '.zip': 'zip',
+}
 
 
 def parameter_sweep(
     *,
-    filename: str,
-    template: PhantomConfig,
+    filename: str = None,
+    template: PhantomConfig = None,
     parameters: Dict[str, List[Any]],
     dummy_parameters: List[str] = None,
     dependent_parameters: Dict[str, List[Dict[str, Any]]] = None,
+    derived_parameters: Dict[str, Union[str, Callable]] = None,
     filetype: str = 'Phantom',
     prefix: str = None,
     output_dir: Union[str, Path] = None,
-):
+    shard_index: int = 0,
+    shard_count: int = 1,
+    incremental: bool = False,
+    fsync: str = 'none',
+    sampler: str = None,
+    n_samples: int = None,
+    seed: int = None,
+    constraints: List[Union[str, Callable]] = None,
+    archive: Union[str, Path] = None,
+    templates: Dict[str, Tuple[PhantomConfig, List[str]]] = None,
+    dedupe: str = None,
+    validator: Validator = None,
+    manifest: Union[str, Path] = None,
+) -> SweepResult:
     """Generate Phantom files in a parameter sweep.
 
     This function takes a dictionary of keys with parameter names and
@@ -27,8 +83,13 @@ def parameter_sweep(
     Each file is placed in a directory like "a-1_b-2_c-3" where "a",
     "b", "c" are parameter names and 1, 2, 3 their values.
 
+    Files are written to a temporary name and renamed into place, so an
+    interrupted sweep never leaves a truncated file. Directories are
+    created in batches.
+
     All parameters must exist in the template file. If you require
-    additional parameters, you can generate multiple template files.
+    additional parameters, you can generate multiple files per point,
+    e.g. a .setup and a .in file, from multiple templates.
 
     Parameters
     ----------
@@ -40,7 +101,8 @@ def parameter_sweep(
         A dict of parameters where each key is a parameter name, and
         each value is a list of parameter values. Make sure the values
         have the correct type as phantomconfig distinguishes between,
-        for example, floats and ints.
+        for example, floats and ints. If using a sampler, a value can
+        also be a Range(low, high) of continuous values.
     dummy_parameters
         A list of parameter names which is a subset of parameters above.
         This set of parameters does not modify the config file. This is
@@ -53,6 +115,14 @@ def parameter_sweep(
         parameters and values dependent on the first key. E.g.
         d = {'a': [{'b': 1.0, 'c': -2.0}, {'b': 2.0, 'c': -4.0}]},
         where 'a' is in parameters and has two values.
+    derived_parameters
+        A dict of parameters computed from other parameters at each
+        point. Each key is a parameter name, and each value is either a
+        string expression like 'tmax / 100', or a callable taking
+        parameters by name, like lambda tmax: tmax / 100. Expressions
+        may use parameters, dependent parameters, and derived parameters
+        earlier in the dict. They are evaluated on batches of points at
+        once, as numpy arrays if numpy is available.
     filetype
         The file type to write. Can be 'Phantom', 'TOML', or 'JSON'.
     prefix
@@ -61,6 +131,85 @@ def parameter_sweep(
     output_dir
         A path in which to output the directories containing each config
         file.
+    shard_index
+        Only generate the points in this shard, where 0 <= shard_index <
+        shard_count. Use this to split a sweep between multiple nodes.
+    shard_count
+        The number of shards. Point i of the full sweep belongs to shard
+        i % shard_count, so the shards are disjoint and together give
+        the full sweep, with the same directory names. The default is a
+        single shard, i.e. the full sweep.
+    incremental
+        If True, only write files whose contents have changed. Files
+        (and directories) which already match the rendered config, as
+        compared by content hash, are left untouched, preserving their
+        modification times.
+    fsync
+        When to flush files to disk: 'none' (leave it to the operating
+        system), 'file' (each file as it is written), or 'end' (once
+        after all files are written). The default is 'none'.
+    sampler
+        If set, generate n_samples points spread over the parameter
+        space instead of the full Cartesian product. One of 'random',
+        'latin_hypercube', 'sobol', or 'halton'. Parameters given as a
+        list are sampled from the list; parameters given as a Range are
+        sampled continuously. Note that Phantom files store floats to
+        limited precision.
+    n_samples
+        The number of points to sample.
+    seed
+        The random seed for the sampler. The same seed always gives the
+        same points; a seed is required to shard a 'random' or
+        'latin_hypercube' sweep.
+    constraints
+        A list of conditions which each point must satisfy; other points
+        are skipped before anything is rendered or written. Each is
+        either a string expression over parameter names, like
+        'nx >= 4 * ndust', or a callable taking parameters by name,
+        like lambda nx, ndust: nx >= 4 * ndust. Each constraint is
+        checked as soon as the parameters it uses are set, so a failing
+        constraint on the first few parameters skips all combinations
+        of the remaining parameters.
+    archive
+        If set, write every file into this single archive instead of
+        into directories, with the same directory layout inside the
+        archive. The format is from the extension: '.tar', '.tar.gz' or
+        '.tgz', '.tar.bz2', '.tar.xz', or '.zip'. If output_dir is set
+        and archive is a relative path, it is relative to output_dir.
+    templates
+        Generate several files for each point in one pass, instead of
+        one file from filename and template. A dict where each key is a
+        file name, and each value is a tuple of (template,
+        dummy_parameters) for that file. Dependent parameters are only
+        set in the templates which contain them.
+    dedupe
+        If 'hardlink' or 'symlink', write each distinct file only once,
+        into a content store directory '.store' in output_dir named by
+        content hash, and link it into each point's directory. This
+        saves writes and disk space when many points have identical
+        files, e.g. when all the swept parameters are dummy parameters
+        for a template. Note that hard linked files share their
+        contents, so edit them by replacing rather than in place. In a
+        tar archive, identical files are stored as hard link members.
+    validator
+        A phantomconfig.validation.Validator. If set, every point is
+        validated, with the template values for variables which are not
+        swept, before any file is written. If any point is invalid, a
+        ValueError listing the problems is raised.
+    manifest
+        If set, write a manifest instead of a directory per point: a
+        CSV table at this path with one row per point, and each template
+        once next to it, in the binary format. Then render the files of
+        a point where they are needed, e.g. on the compute node of a job
+        array, with phantomconfig.manifest.materialize. If output_dir is
+        set and manifest is a relative path, it is relative to
+        output_dir. Cannot be used with archive, dedupe, or incremental.
+
+    Returns
+    -------
+    SweepResult
+        A named tuple with the number of files created, updated, and
+        unchanged.
 
     Examples
     --------
@@ -101,9 +250,192 @@ def parameter_sweep(
     ...     parameters=parameters,
     ...     dummy_parameters=['ndust', 'nx'],
     ... )
+
+    Or generate the .setup and .in files in one pass, with both files
+    for each point in the same directory.
+
+    >>> pc.parameter_sweep(
+    ...     templates={
+    ...         'dustyshock.setup': (read_config('dustyshock.setup'), ['hfact']),
+    ...         'dustyshock.in': (read_config('dustyshock.in'), ['ndust', 'nx']),
+    ...     },
+    ...     parameters=parameters,
+    ...     dependent_parameters=dependent_parameters,
+    ... )
+
+    Generate the second of four shards of the .in files, e.g. on the
+    second of four nodes.
+
+    >>> pc.parameter_sweep(
+    ...     filename='dustyshock.in',
+    ...     template=template,
+    ...     parameters=parameters,
+    ...     dummy_parameters=['ndust', 'nx'],
+    ...     shard_index=1,
+    ...     shard_count=4,
+    ... )
+
+    Generate 500 .in files spread over a continuous range of 'alpha'
+    and 'hfact' with a Sobol sequence.
+
+    >>> pc.parameter_sweep(
+    ...     filename='dustyshock.in',
+    ...     template=template,
+    ...     parameters={'alpha': pc.Range(0.1, 1.0), 'hfact': pc.Range(1.0, 1.5)},
+    ...     sampler='sobol',
+    ...     n_samples=500,
+    ...     seed=42,
+    ... )
+
+    Only generate .setup files with at least 64 particles per dust
+    species.
+
+    >>> pc.parameter_sweep(
+    ...     filename='dustyshock.setup',
+    ...     template=template,
+    ...     parameters=parameters,
+    ...     dependent_parameters=dependent_parameters,
+    ...     dummy_parameters=['hfact'],
+    ...     constraints=['nx >= 64 * ndust'],
+    ... )
+
+    Write the .in files into a compressed tar file rather than a
+    directory per point.
+
+    >>> pc.parameter_sweep(
+    ...     filename='dustyshock.in',
+    ...     template=template,
+    ...     parameters=parameters,
+    ...     dummy_parameters=['ndust', 'nx'],
+    ...     archive='dustyshock.tar.gz',
+    ... )
+
+    Write a manifest for a job array, and render the files of each
+    point in its job.
+
+    >>> pc.parameter_sweep(
+    ...     filename='dustyshock.in',
+    ...     template=template,
+    ...     parameters=parameters,
+    ...     dummy_parameters=['ndust', 'nx'],
+    ...     manifest='dustyshock.csv',
+    ... )
+    >>> pc.materialize('dustyshock.csv', int(os.environ['SLURM_ARRAY_TASK_ID']))
     """
     if filetype.lower() not in ('phantom', 'toml', 'json'):
         raise ValueError('Cannot determine filetype')
+    _templates, dummy_parameters = _sweep_templates(
+        parameters,
+        filename,
+        template,
+        dummy_parameters,
+        templates,
+        dependent_parameters,
+        derived_parameters,
+    )
+    points: Iterable[Tuple[str, Dict[str, Any]]] = sweep_points(
+        parameters=parameters,
+        dummy_parameters=dummy_parameters,
+        dependent_parameters=dependent_parameters,
+        derived_parameters=derived_parameters,
+        prefix=prefix,
+        shard_index=shard_index,
+        shard_count=shard_count,
+        sampler=sampler,
+        n_samples=n_samples,
+        seed=seed,
+        constraints=constraints,
+    )
+    if validator is not None:
+        points = _validate_points(validator, points, template, templates)
+    if manifest is not None:
+        return _write_manifest(
+            manifest,
+            output_dir,
+            template,
+            templates,
+            filename,
+            dummy_parameters,
+            points,
+            incremental,
+            fsync,
+            archive,
+            dedupe,
+        )
+    writer = _make_writer(output_dir, archive, incremental, fsync, dedupe)
+
+    files = _render_files(_templates, points)
+    try:
+        for batch in _batched(files, _BATCH_SIZE):
+            writer.write(batch)
+    except BaseException:
+        writer.abort()
+        raise
+
+    return writer.close()
+
+
+def sweep_points(
+    *,
+    parameters: Dict[str, List[Any]],
+    dummy_parameters: List[str] = None,
+    dependent_parameters: Dict[str, List[Dict[str, Any]]] = None,
+    derived_parameters: Dict[str, Union[str, Callable]] = None,
+    prefix: str = None,
+    shard_index: int = 0,
+    shard_count: int = 1,
+    sampler: str = None,
+    n_samples: int = None,
+    seed: int = None,
+    constraints: List[Union[str, Callable]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Iterate lazily over the points in a parameter sweep.
+
+    The arguments are as for parameter_sweep. The arguments are checked
+    immediately, but the points are only generated on iteration.
+
+    Parameters
+    ----------
+    parameters
+        A dict of parameters where each key is a parameter name, and
+        each value is a list of parameter values, or a Range if using a
+        sampler.
+    dummy_parameters
+        A list of parameter names which is a subset of parameters above.
+        This set of parameters does not modify the config file.
+    dependent_parameters
+        A dict of dict of parameters dependent on a parameter in
+        parameters above.
+    derived_parameters
+        A dict of parameters computed from other parameters by
+        expressions or callables. See parameter_sweep.
+    prefix
+        A common prefix for the directories containing each config
+        file.
+    shard_index
+        Only iterate over the points in this shard.
+    shard_count
+        The number of shards. Point i of the full sweep belongs to shard
+        i % shard_count.
+    sampler
+        If set, sample n_samples points with this strategy instead of
+        taking the Cartesian product. See parameter_sweep.
+    n_samples
+        The number of points to sample.
+    seed
+        The random seed for the sampler.
+    constraints
+        A list of conditions, as expressions or callables, which each
+        point must satisfy. See parameter_sweep.
+
+    Yields
+    ------
+    directory : str
+        The name of the directory for this point.
+    values : dict
+        The config variables to change for this point, like
+            {'variable': value, ...}.
+    """
     if dummy_parameters is None:
         dummy_parameters = []
     if dependent_parameters is None:
@@ -114,28 +446,776 @@ def parameter_sweep(
         raise ValueError(
             'dependent_parameters keys must be a subset of keys in parameters'
         )
-    if output_dir is not None:
-        _output_dir = Path(output_dir).expanduser()
+    derived = _derived_expressions(
+        parameters, dependent_parameters, derived_parameters or {}
+    )
+    if shard_count < 1:
+        raise ValueError('shard_count must be at least 1')
+    if not 0 <= shard_index < shard_count:
+        raise ValueError('shard_index must be in the range [0, shard_count)')
+
+    _constraints = [Expression(constraint) for constraint in constraints or []]
+    for constraint in _constraints:
+        if constraint.names is not None and not constraint.names.issubset(
+            parameters.keys()
+        ):
+            raise ValueError(
+                f'constraint {constraint.expression!r} uses names not in parameters'
+            )
+
+    if sampler is None:
+        if any(isinstance(values, Range) for values in parameters.values()):
+            raise ValueError('A Range of parameter values requires a sampler')
+        if _constraints:
+            combinations: Iterator[Tuple] = _constrained_product(
+                parameters, _constraints
+            )
+        else:
+            combinations = product(*parameters.values())
     else:
-        _output_dir = Path()
-    if not _output_dir.exists():
-        _output_dir.mkdir(parents=True)
+        if n_samples is None:
+            raise ValueError('n_samples is required with a sampler')
+        if any(isinstance(parameters[name], Range) for name in dependent_parameters):
+            raise ValueError('dependent_parameters keys must have discrete values')
+        if shard_count > 1 and seed is None and sampler in _RANDOM_SAMPLERS:
+            raise ValueError('A seed is required to shard a random sampler')
+        combinations = sample_points(parameters, sampler, n_samples, seed=seed)
+        if _constraints:
+            combinations = (
+                params
+                for params in combinations
+                if all(
+                    constraint(dict(zip(parameters, params)))
+                    for constraint in _constraints
+                )
+            )
+    if shard_count > 1:
+        combinations = islice(combinations, shard_index, None, shard_count)
 
+    return _iterate_points(
+        parameters,
+        combinations,
+        dummy_parameters,
+        dependent_parameters,
+        prefix,
+        derived,
+    )
+
+
+def _iterate_points(
+    parameters: Dict[str, List[Any]],
+    combinations: Iterator[Tuple],
+    dummy_parameters: List[str],
+    dependent_parameters: Dict[str, List[Dict[str, Any]]],
+    prefix: Optional[str],
+    derived: List[Tuple[str, Expression]] = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Generate the points in a parameter sweep.
+
+    Derived parameters are evaluated on batches of points.
+    """
     names = parameters.keys()
-    values = [element for element in product(*parameters.values())]
-    for params in values:
+    # Map each value of a parameter with dependent parameters to its first
+    # index, instead of searching the list of values at every point.
+    indices = {name: _first_indices(parameters[name]) for name in dependent_parameters}
+
+    def _point(params: Tuple) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
         directory = '-'.join([f'{k}_{v}' for k, v in zip(names, params)])
         if prefix is not None:
             directory = prefix + directory
-        _directory = _output_dir / directory
-        if not _directory.exists():
-            _directory.mkdir()
+        updates = dict()
+        namespace = dict()
         for idx, name in enumerate(names):
             if name not in dummy_parameters:
-                template.change_value(name, params[idx])
-            if name in dependent_parameters.keys():
-                _idx = parameters[name].index(params[idx])
-                _params = dependent_parameters[name][_idx]
-                for key, val in _params.items():
-                    template.change_value(key, val)
-        template.write_phantom(filename=_directory / filename)
+                updates[name] = params[idx]
+            if name in indices:
+                _idx = indices[name].get(params[idx])
+                if _idx is None:
+                    _idx = parameters[name].index(params[idx])
+                updates.update(dependent_parameters[name][_idx])
+                if derived:
+                    namespace.update(dependent_parameters[name][_idx])
+        if derived:
+            namespace.update(zip(names, params))
+        return directory, updates, namespace
+
+    if not derived:
+        for params in combinations:
+            directory, updates, _ = _point(params)
+            yield directory, updates
+        return
+
+    np = _numpy()
+    for batch in _batched(combinations, _BATCH_SIZE):
+        points = [_point(params) for params in batch]
+        namespaces = [namespace for _, _, namespace in points]
+        for name, expression in derived:
+            values = _evaluate(np, expression, namespaces)
+            for (_, updates, namespace), value in zip(points, values):
+                namespace[name] = value
+                updates[name] = value
+        for directory, updates, _ in points:
+            yield directory, updates
+
+
+def _first_indices(values: List[Any]) -> Dict[Any, int]:
+    """Map each hashable value in a list to the index of its first occurrence."""
+    indices: Dict[Any, int] = dict()
+    for idx, value in enumerate(values):
+        try:
+            indices.setdefault(value, idx)
+        except TypeError:
+            continue
+    return indices
+
+
+def _derived_expressions(
+    parameters: Dict[str, List[Any]],
+    dependent_parameters: Dict[str, List[Dict[str, Any]]],
+    derived_parameters: Dict[str, Union[str, Callable]],
+) -> List[Tuple[str, Expression]]:
+    """Check and compile the expressions for derived parameters."""
+    known = set(parameters)
+    for _parameters in dependent_parameters.values():
+        for _dict in _parameters:
+            known.update(_dict.keys())
+    derived = list()
+    for name, expression in derived_parameters.items():
+        if name in known:
+            raise ValueError(f'derived parameter {name} is already a parameter')
+        _expression = Expression(expression)
+        if _expression.names is not None and not _expression.names <= known:
+            raise ValueError(
+                f'derived parameter {name} uses unknown names: '
+                f'{set(_expression.names - known)}'
+            )
+        derived.append((name, _expression))
+        known.add(name)
+    return derived
+
+
+def _evaluate(np, expression: Expression, namespaces: List[Dict[str, Any]]) -> List:
+    """Evaluate an expression at a batch of points.
+
+    With numpy, the expression is evaluated once on arrays of the values
+    at all points. If that fails, e.g. for values which are not numbers,
+    it is evaluated at each point.
+    """
+    names = expression.names
+    if names is None:
+        names = frozenset(namespaces[0]) if namespaces else frozenset()
+    if np is not None and namespaces:
+        try:
+            columns = {
+                name: _as_array(np, [namespace[name] for namespace in namespaces])
+                for name in names
+            }
+            with np.errstate(all='raise'):
+                values = expression(columns, _numpy_functions(np))
+            values = np.broadcast_to(np.asarray(values), (len(namespaces),))
+            if values.dtype.kind in 'biuf':
+                return values.tolist()
+        except Exception:
+            pass
+    return [
+        expression({name: namespace[name] for name in names})
+        for namespace in namespaces
+    ]
+
+
+def _constrained_product(
+    parameters: Dict[str, List[Any]], constraints: List[Expression]
+) -> Iterator[Tuple]:
+    """The Cartesian product of parameters, pruned by constraints.
+
+    Each constraint is checked at the first level of the product at
+    which all of its parameters are set. If it fails, the remaining
+    levels for that partial combination are skipped.
+    """
+    names = list(parameters.keys())
+    values = list(parameters.values())
+    if not names:
+        yield ()
+        return
+    checks: List[List[Expression]] = [list() for _ in names]
+    for constraint in constraints:
+        if constraint.names is None:
+            level = len(names) - 1
+        else:
+            level = max((names.index(name) for name in constraint.names), default=0)
+        checks[level].append(constraint)
+
+    namespace: Dict[str, Any] = dict()
+    last = len(names) - 1
+
+    def _product(level: int, params: Tuple) -> Iterator[Tuple]:
+        for value in values[level]:
+            namespace[names[level]] = value
+            if not all(constraint(namespace) for constraint in checks[level]):
+                continue
+            if level == last:
+                yield params + (value,)
+            else:
+                yield from _product(level + 1, params + (value,))
+
+    yield from _product(0, ())
+
+
+def _make_output_dir(output_dir: Optional[Union[str, Path]]) -> Path:
+    """Create the sweep output directory if required."""
+    if output_dir is not None:
+        _output_dir = Path(output_dir).expanduser()
+    else:
+        _output_dir = Path()
+    if not _output_dir.exists():
+        _output_dir.mkdir(parents=True)
+    return _output_dir
+
+
+def _sweep_templates(
+    parameters: Dict[str, List[Any]],
+    filename: Optional[str],
+    template: Optional[PhantomConfig],
+    dummy_parameters: Optional[List[str]],
+    templates: Optional[Dict[str, Tuple[PhantomConfig, List[str]]]],
+    dependent_parameters: Optional[Dict[str, List[Dict[str, Any]]]],
+    derived_parameters: Optional[Dict[str, Union[str, Callable]]] = None,
+) -> Tuple[List[Tuple[str, CompiledTemplate, Set[str]]], List[str]]:
+    """Get the compiled templates to render at each point in a sweep.
+
+    Returns
+    -------
+    templates : list
+        A list of (filename, template, excluded) tuples, where template
+        has a slot for each parameter it sets, and excluded is the set of
+        parameter names not to set in that template.
+    dummy_parameters : list
+        The parameters which are dummy parameters for every template.
+    """
+    if templates is None:
+        if filename is None or template is None:
+            raise ValueError('Need filename and template, or templates')
+        templates = {filename: (template, dummy_parameters or [])}
+    elif filename is not None or template is not None:
+        raise ValueError('Cannot use filename or template with templates')
+    elif dummy_parameters is not None:
+        raise ValueError('Set dummy_parameters per template with templates')
+    if not templates:
+        raise ValueError('templates must not be empty')
+    for _, _dummy in templates.values():
+        if not set(_dummy).issubset(set(parameters.keys())):
+            raise ValueError('dummy_parameters must be a subset of keys in parameters')
+
+    dependent_names: Set[str] = set()
+    for _parameters in (dependent_parameters or {}).values():
+        for _dict in _parameters:
+            dependent_names.update(_dict.keys())
+    dependent_names.update(derived_parameters or {})
+    template_names: Set[str] = set()
+    for _template, _ in templates.values():
+        template_names.update(_template.config.keys())
+    missing = dependent_names - template_names
+    if missing:
+        raise ValueError(
+            f'dependent or derived parameters not in any template: {missing}'
+        )
+
+    _templates = list()
+    for _filename, (_template, _dummy) in templates.items():
+        excluded = set(_dummy) | (dependent_names - _template.config.keys())
+        slots = [name for name in parameters if name not in excluded]
+        slots += [name for name in dependent_names if name not in excluded]
+        _templates.append((_filename, compile_template(_template, slots), excluded))
+    dummy_parameters = [
+        name
+        for name in list(templates.values())[0][1]
+        if all(name in _dummy for _, _dummy in templates.values())
+    ]
+    return _templates, dummy_parameters
+
+
+def _render_files(
+    templates: List[Tuple[str, CompiledTemplate, Set[str]]],
+    points: Iterable[Tuple[str, Dict[str, Any]]],
+) -> Iterator[Tuple[str, bytes]]:
+    """Render the files for each point in a sweep.
+
+    Parameters
+    ----------
+    templates
+        A list of (filename, template, excluded) tuples, as from
+        _sweep_templates.
+    points
+        The points in the sweep, as from sweep_points.
+
+    Yields
+    ------
+    path : str
+        The path of the file relative to the output directory.
+    data : bytes
+        The rendered file.
+    """
+    for directory, updates in points:
+        for filename, template, excluded in templates:
+            if excluded:
+                _updates = {
+                    name: value
+                    for name, value in updates.items()
+                    if name not in excluded
+                }
+            else:
+                _updates = updates
+            yield f'{directory}/{filename}', template.render(_updates)
+
+
+def _validate_points(
+    validator: Validator,
+    points: Iterable[Tuple[str, Dict[str, Any]]],
+    template: Optional[PhantomConfig],
+    templates: Optional[Dict[str, Tuple[PhantomConfig, List[str]]]],
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """Validate all points in a sweep before any file is written.
+
+    The values in the templates are used for variables which are not
+    swept. Raises ValueError if any point is invalid.
+    """
+    points = list(points)
+    if templates is None:
+        assert template is not None
+        configs = [template]
+    else:
+        configs = [config for config, _ in templates.values()]
+    defaults: Dict[str, Any] = dict()
+    for config in configs:
+        for variable, item in config.config.items():
+            defaults.setdefault(variable, item.value)
+    validator.check([updates for _, updates in points], defaults)
+    return points
+
+
+def _write_manifest(
+    manifest: Union[str, Path],
+    output_dir: Optional[Union[str, Path]],
+    template: Optional[PhantomConfig],
+    templates: Optional[Dict[str, Tuple[PhantomConfig, List[str]]]],
+    filename: Optional[str],
+    dummy_parameters: List[str],
+    points: Iterable[Tuple[str, Dict[str, Any]]],
+    incremental: bool,
+    fsync: str,
+    archive: Optional[Union[str, Path]],
+    dedupe: Optional[str],
+) -> SweepResult:
+    """Write a manifest of the points in a sweep, instead of the files."""
+    if archive is not None or dedupe is not None or incremental:
+        raise ValueError('Cannot use manifest with archive, dedupe, or incremental')
+    if fsync not in _FSYNC_POLICIES:
+        raise ValueError(f'fsync must be one of {_FSYNC_POLICIES}')
+    if templates is None:
+        assert filename is not None and template is not None
+        templates = {filename: (template, dummy_parameters)}
+    _output_dir = _make_output_dir(output_dir)
+    path = _output_dir / Path(manifest).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    _, paths = write_manifest(
+        path,
+        {name: (config, set(dummy)) for name, (config, dummy) in templates.items()},
+        points,
+        fsync=fsync == 'file',
+    )
+    if fsync == 'end':
+        for _path in paths:
+            with open(_path, mode='rb') as fp:
+                os.fsync(fp.fileno())
+        _fsync_directory(path.parent)
+    return SweepResult(len(paths), 0, 0)
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class _SweepWriter:
+    """Write the files of a parameter sweep in batches.
+
+    Each file is written to a temporary file in the same directory and
+    then renamed, so an interrupted sweep never leaves a truncated file.
+    The directories needed by each batch are created together. Existing
+    directories are found with one scan of each parent directory, and
+    directories already known to exist are not checked again.
+
+    Parameters
+    ----------
+    output_dir
+        The directory in which to write files.
+    incremental
+        If True, do not write files which already have the same
+        contents.
+    fsync
+        When to flush files to disk: 'none', 'file' (each file before
+        it is renamed), or 'end' (all files, when the writer is closed).
+        With 'file' or 'end', each directory with new entries is also
+        flushed once, when the writer is closed, so that the renames are
+        durable.
+    dedupe
+        If 'hardlink' or 'symlink', write each distinct file once into
+        a content store in the output directory, and link it into
+        place.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        incremental: bool = False,
+        fsync: str = 'none',
+        dedupe: str = None,
+    ) -> None:
+        if fsync not in _FSYNC_POLICIES:
+            raise ValueError(f'fsync must be one of {_FSYNC_POLICIES}')
+        if dedupe not in _DEDUPE_MODES:
+            raise ValueError(f'dedupe must be one of {_DEDUPE_MODES}')
+        self.output_dir = output_dir
+        self.incremental = incremental
+        self.fsync = fsync
+        self.dedupe = dedupe
+        self.directories = {
+            entry.name for entry in os.scandir(output_dir) if entry.is_dir()
+        }
+        self.scanned = {''}
+        self.created: Set[str] = set()
+        self.touched: Set[Path] = set()
+        self.store = output_dir / _STORE_DIRECTORY
+        self.stored: Set[str] = set()
+        if dedupe is not None:
+            self._make_directory(_STORE_DIRECTORY)
+            self.stored.update(
+                entry.name for entry in os.scandir(self.store) if entry.is_file()
+            )
+        self.written: List[Path] = list()
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+        self._lock = threading.Lock()
+
+    def write(self, files: List[Tuple[str, bytes]]) -> None:
+        """Write a batch of files.
+
+        Parameters
+        ----------
+        files
+            A list of (path, data) pairs, where path is relative to the
+            output directory.
+        """
+        counts = {'created': 0, 'updated': 0, 'unchanged': 0}
+
+        if self.incremental:
+            _files = list()
+            for path, data in files:
+                if _same_contents(self.output_dir / path, data):
+                    counts['unchanged'] += 1
+                else:
+                    _files.append((path, data))
+            files = _files
+
+        directories = {path.rpartition('/')[0] for path, _ in files}
+        with self._lock:
+            for directory in sorted(directories):
+                self._make_directory(directory)
+            created = set(self.created)
+
+        for path, data in files:
+            directory = path.rpartition('/')[0]
+            _path = self.output_dir / path
+            if directory in created:
+                counts['created'] += 1
+            elif os.path.lexists(_path):
+                counts['updated'] += 1
+            else:
+                counts['created'] += 1
+            if self.dedupe is None:
+                _write_atomic(_path, data, fsync=self.fsync == 'file')
+            else:
+                self._link(_path, data)
+
+        with self._lock:
+            if self.fsync != 'none':
+                self.touched.update(self.output_dir / d for d in directories)
+            if self.fsync == 'end':
+                self.written.extend(self.output_dir / path for path, _ in files)
+            for key, value in counts.items():
+                self.counts[key] += value
+
+    def _make_directory(self, directory: str) -> None:
+        """Create a directory, relative to the output directory, if required.
+
+        The first time a directory is needed in a parent directory, the
+        parent is scanned for existing directories.
+        """
+        if not directory or directory in self.directories:
+            return
+        parent = directory.rpartition('/')[0]
+        self._make_directory(parent)
+        if parent not in self.scanned:
+            self.scanned.add(parent)
+            if parent not in self.created:
+                prefix = parent + '/' if parent else ''
+                self.directories.update(
+                    prefix + entry.name
+                    for entry in os.scandir(self.output_dir / parent)
+                    if entry.is_dir()
+                )
+                if directory in self.directories:
+                    return
+        try:
+            (self.output_dir / directory).mkdir()
+        except FileExistsError:
+            pass
+        else:
+            self.created.add(directory)
+            if self.fsync != 'none':
+                self.touched.add(self.output_dir / parent)
+        self.directories.add(directory)
+
+    def _link(self, path: Path, data: bytes) -> None:
+        """Link a file into place from the content store."""
+        digest = hashlib.sha256(data).hexdigest()
+        source = self.store / digest
+        with self._lock:
+            if digest not in self.stored:
+                _write_atomic(source, data, fsync=self.fsync == 'file')
+                self.stored.add(digest)
+                if self.fsync == 'end':
+                    self.written.append(source)
+                if self.fsync != 'none':
+                    self.touched.add(self.store)
+        tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        try:
+            if self.dedupe == 'hardlink':
+                os.link(source, tmp_path)
+            else:
+                os.symlink(os.path.relpath(source, path.parent), tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def close(self) -> SweepResult:
+        """Finish writing, flushing files to disk if required.
+
+        Returns
+        -------
+        SweepResult
+            The number of files created, updated, and unchanged.
+        """
+        if self.fsync == 'end':
+            for path in self.written:
+                if not path.is_symlink():
+                    with open(path, mode='rb') as fp:
+                        os.fsync(fp.fileno())
+        for directory in sorted(self.touched):
+            _fsync_directory(directory)
+        self.written = list()
+        self.touched = set()
+        return SweepResult(**self.counts)
+
+    def abort(self) -> None:
+        """Stop writing after an error."""
+        self.written = list()
+        self.touched = set()
+
+
+class _ArchiveWriter:
+    """Write the files of a parameter sweep into a single archive.
+
+    The archive is written to a temporary file and renamed into place
+    when closed, so an interrupted sweep never leaves a partial archive.
+
+    Parameters
+    ----------
+    path
+        The archive file. The format is determined from the extension.
+    fsync
+        If 'file' or 'end', flush the archive to disk before it is
+        renamed.
+    dedupe
+        If set, store identical files once, with later copies as hard
+        link members. Only supported for tar archives.
+    """
+
+    def __init__(self, path: Path, fsync: str = 'none', dedupe: str = None) -> None:
+        if fsync not in _FSYNC_POLICIES:
+            raise ValueError(f'fsync must be one of {_FSYNC_POLICIES}')
+        if dedupe not in _DEDUPE_MODES:
+            raise ValueError(f'dedupe must be one of {_DEDUPE_MODES}')
+        name = path.name.lower()
+        for suffix, mode in _ARCHIVE_MODES.items():
+            if name.endswith(suffix):
+                break
+        else:
+            raise ValueError(
+                f'Cannot determine archive format; use one of {tuple(_ARCHIVE_MODES)}'
+            )
+        if dedupe is not None and mode == 'zip':
+            raise ValueError('Cannot dedupe files in a zip archive')
+        self.path = path
+        self.fsync = fsync
+        self.dedupe = dedupe
+        self.members: Dict[bytes, str] = dict()
+        self.count = 0
+        self.mtime = time.time()
+        self._tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        self._lock = threading.Lock()
+        self._fp = open(self._tmp_path, mode='wb')
+        self._archive: Union[tarfile.TarFile, zipfile.ZipFile]
+        try:
+            if mode == 'zip':
+                self._archive = zipfile.ZipFile(
+                    self._fp, mode='w', compression=zipfile.ZIP_DEFLATED
+                )
+            else:
+                self._archive = tarfile.open(fileobj=self._fp, mode=mode)
+        except BaseException:
+            self.abort()
+            raise
+
+    def write(self, files: List[Tuple[str, bytes]]) -> None:
+        """Add a batch of files to the archive.
+
+        Parameters
+        ----------
+        files
+            A list of (path, data) pairs, where path is the name of the
+            file in the archive.
+        """
+        with self._lock:
+            for path, data in files:
+                if isinstance(self._archive, zipfile.ZipFile):
+                    info = zipfile.ZipInfo(
+                        path, date_time=time.localtime(self.mtime)[:6]
+                    )
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.external_attr = 0o644 << 16
+                    self._archive.writestr(info, data)
+                else:
+                    tarinfo = tarfile.TarInfo(path)
+                    tarinfo.mtime = int(self.mtime)
+                    tarinfo.mode = 0o644
+                    digest = b''
+                    if self.dedupe is not None:
+                        digest = hashlib.sha256(data).digest()
+                    if digest in self.members:
+                        tarinfo.type = tarfile.LNKTYPE
+                        tarinfo.linkname = self.members[digest]
+                        self._archive.addfile(tarinfo)
+                    else:
+                        tarinfo.size = len(data)
+                        self._archive.addfile(tarinfo, io.BytesIO(data))
+                        if self.dedupe is not None:
+                            self.members[digest] = path
+                self.count += 1
+
+    def close(self) -> SweepResult:
+        """Finish the archive and move it into place.
+
+        Returns
+        -------
+        SweepResult
+            The number of files created in the archive.
+        """
+        try:
+            self._archive.close()
+            if self.fsync != 'none':
+                self._fp.flush()
+                os.fsync(self._fp.fileno())
+            self._fp.close()
+            os.replace(self._tmp_path, self.path)
+            if self.fsync != 'none':
+                _fsync_directory(self.path.parent)
+        except BaseException:
+            self.abort()
+            raise
+        return SweepResult(created=self.count, updated=0, unchanged=0)
+
+    def abort(self) -> None:
+        """Stop writing and remove the partial archive."""
+        with self._lock:
+            self._fp.close()
+            try:
+                os.unlink(self._tmp_path)
+            except FileNotFoundError:
+                pass
+
+
+def _make_writer(
+    output_dir: Optional[Union[str, Path]],
+    archive: Optional[Union[str, Path]],
+    incremental: bool,
+    fsync: str,
+    dedupe: Optional[str],
+) -> Union[_SweepWriter, _ArchiveWriter]:
+    """Create the output directory and the writer for a sweep."""
+    _output_dir = _make_output_dir(output_dir)
+    if archive is None:
+        return _SweepWriter(
+            _output_dir, incremental=incremental, fsync=fsync, dedupe=dedupe
+        )
+    if incremental:
+        raise ValueError('Cannot write an archive incrementally')
+    return _ArchiveWriter(
+        _output_dir / Path(archive).expanduser(), fsync=fsync, dedupe=dedupe
+    )
+
+
+def _write_atomic(path: Path, data: bytes, fsync: bool = False) -> None:
+    """Write a file via a temporary file and a rename."""
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_path, mode='wb') as fp:
+            fp.write(data)
+            if fsync:
+                fp.flush()
+                os.fsync(fp.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _fsync_directory(directory: Path) -> None:
+    """Flush a directory to disk, so that renames in it are durable.
+
+    Does nothing on platforms which cannot open a directory, e.g.
+    Windows.
+    """
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _same_contents(path: Path, data: bytes) -> bool:
+    """Check if a file exists with the same contents as data."""
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        with open(path, mode='rb') as fp:
+            contents = fp.read()
+    except FileNotFoundError:
+        return False
+    return contents == data
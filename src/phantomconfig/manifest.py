@@ -0,0 +1,170 @@
+"""Job array manifests: render each point of a sweep where it runs.
+
+A manifest is a CSV table with one row per point of a parameter sweep,
+holding the directory name and the swept values, written next to the
+templates, which are written once in the binary format. Write it with
+parameter_sweep(manifest=...) on the login node, then materialize the
+files of one point on the compute node from its index, e.g. the job
+array task ID.
+
+The first line of the table is a comment with the template files and
+the parameters excluded from each, as JSON. The values are stored as
+they are formatted in Phantom files, so a materialized file is the same
+as the file parameter_sweep would write. A cell is '!' if the point does
+not set the variable, since '!' starts a comment in a Phantom file and
+so cannot be in a value, and an empty cell is an empty string.
+
+Examples
+--------
+>>> import phantomconfig as pc
+>>> pc.parameter_sweep(
+...     filename='dustyshock.in',
+...     template=template,
+...     parameters=parameters,
+...     manifest='sweep.csv',
+... )
+
+Then in the job script for each task in the job array:
+
+>>> from phantomconfig.manifest import materialize
+>>> materialize('sweep.csv', int(os.environ['SLURM_ARRAY_TASK_ID']))
+"""
+
+import csv
+import io
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Set, Tuple, Union
+
+from .parsers import _convert_value_type_phantom
+from .phantomconfig import PhantomConfig, _phantom_value_format
+from .templates import compile_template
+
+_COMMENT = '# phantomconfig manifest '
+_VERSION = 1
+# The cell for a variable which is not set at a point.
+_ABSENT = '!'
+
+
+def write_manifest(
+    path: Path,
+    templates: Dict[str, Tuple[PhantomConfig, Set[str]]],
+    points: Iterable[Tuple[str, Dict[str, Any]]],
+    fsync: bool = False,
+) -> Tuple[int, List[Path]]:
+    """Write a manifest of the points in a sweep and its templates.
+
+    Parameters
+    ----------
+    path
+        The path of the manifest table.
+    templates
+        A dict where each key is a file name, and each value is a tuple
+        of the template and the parameters not to set in it.
+    points
+        The points in the sweep, as from sweep_points.
+    fsync
+        If True, flush each file to disk.
+
+    Returns
+    -------
+    n_points : int
+        The number of points, i.e. rows, in the manifest.
+    paths : list
+        The paths of the files written.
+    """
+    import json
+
+    from .generators import _write_atomic
+
+    metadata: Dict[str, Any] = {'version': _VERSION, 'templates': dict()}
+    paths = list()
+    for filename, (template, excluded) in templates.items():
+        template_path = path.with_name(f'{path.stem}.{filename}.bin')
+        _write_atomic(template_path, template.to_bytes(), fsync=fsync)
+        paths.append(template_path)
+        metadata['templates'][filename] = {
+            'template': template_path.name,
+            'excluded': sorted(excluded),
+        }
+
+    # The columns are only known once every point is generated, so the
+    # rows are formatted first.
+    columns: Dict[str, None] = dict()
+    rows = list()
+    for directory, updates in points:
+        columns.update(dict.fromkeys(updates))
+        rows.append(
+            (directory, {k: _phantom_value_format(v, 0) for k, v in updates.items()})
+        )
+
+    stream = io.StringIO()
+    stream.write(_COMMENT + json.dumps(metadata) + '\n')
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(['directory', *columns])
+    for directory, values in rows:
+        writer.writerow([directory, *(values.get(name, _ABSENT) for name in columns)])
+    _write_atomic(path, stream.getvalue().encode(), fsync=fsync)
+    paths.append(path)
+    return len(rows), paths
+
+
+def materialize(
+    manifest: Union[str, Path], index: int, output_dir: Union[str, Path] = None
+) -> List[Path]:
+    """Write the files of one point in a manifest.
+
+    Parameters
+    ----------
+    manifest
+        The manifest, as from parameter_sweep(manifest=...).
+    index
+        The index of the point, from 0, in the order of the sweep.
+    output_dir
+        Write the files into the directory for the point in this
+        directory. Default is the current directory.
+
+    Returns
+    -------
+    list
+        The paths of the files written.
+    """
+    import json
+
+    from .generators import _write_atomic
+
+    manifest = Path(manifest).expanduser()
+    if index < 0:
+        raise ValueError('index must be non-negative')
+    with open(manifest, newline='') as fp:
+        comment = fp.readline()
+        if not comment.startswith(_COMMENT):
+            raise ValueError(f'{manifest} is not a manifest')
+        metadata = json.loads(comment[len(_COMMENT) :])
+        if metadata.get('version') != _VERSION:
+            raise ValueError(f'Cannot read manifest version {metadata.get("version")}')
+        reader = csv.reader(fp)
+        columns = next(reader)[1:]
+        row = next(islice(reader, index, None), None)
+    if row is None:
+        raise ValueError(f'index {index} is not in {manifest}')
+    directory, strings = row[0], row[1:]
+
+    point_dir = Path(output_dir or '').expanduser() / directory
+    point_dir.mkdir(parents=True, exist_ok=True)
+    paths = list()
+    for filename, info in metadata['templates'].items():
+        template = PhantomConfig(
+            filename=manifest.with_name(info['template']), filetype='binary'
+        )
+        excluded = set(info['excluded'])
+        values = {
+            name: _convert_value_type_phantom(string, type(template.config[name].value))
+            for name, string in zip(columns, strings)
+            if string != _ABSENT and name not in excluded and name in template.config
+        }
+        data = compile_template(template, values).render(values)
+        path = point_dir / filename
+        _write_atomic(path, data)
+        paths.append(path)
+    return paths
@@ -0,0 +1,175 @@
+"""Measure the memory used by configs.
+
+Examples
+--------
+>>> import phantomconfig as pc
+>>> from phantomconfig.memory import measure_read_config, memory_usage
+>>> configs = [pc.read_config(path) for path in paths]
+>>> memory_usage(configs).total
+>>> measure_read_config(paths).current
+"""
+
+import sys
+from collections import namedtuple
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Union
+
+from .chain import ChainConfig
+from .phantomconfig import PhantomConfig
+from .snapshot import _REMOVED, ConfigSnapshot
+
+
+class MemoryUsage(
+    namedtuple(
+        'MemoryUsage', ['names', 'values', 'comments', 'blocks', 'header', 'overhead']
+    )
+):
+    """The memory used by configs, in bytes.
+
+    names, values, comments, blocks, and header are the memory of the
+    objects themselves. overhead is the memory of the dicts and tuples
+    which hold them.
+    """
+
+    __slots__ = ()
+
+    @property
+    def total(self) -> int:
+        """The total memory in bytes."""
+        return sum(self)
+
+
+ReadMeasurement = namedtuple('ReadMeasurement', ['n_files', 'current', 'peak'])
+ReadMeasurement.__doc__ = """The memory allocated to read config files.
+
+n_files is the number of files read. current is the memory in bytes
+still allocated once all the configs are read, and peak is the most
+memory in bytes allocated while reading.
+"""
+
+
+def memory_usage(configs: Iterable[Any], deep: bool = True) -> MemoryUsage:
+    """Get the memory used by configs.
+
+    Each object is counted once, so strings shared between configs,
+    e.g. interned comments, are only counted once.
+
+    Parameters
+    ----------
+    configs
+        PhantomConfig, ChainConfig, or ConfigSnapshot objects.
+    deep
+        If True, count the names, values, comments, blocks, and header
+        lines. If False, only count the dicts and tuples which hold
+        them. Default is True.
+
+    Returns
+    -------
+    MemoryUsage
+        The memory in bytes of each part of the configs.
+    """
+    counter = _Counter(deep)
+    for config in configs:
+        if isinstance(config, PhantomConfig):
+            counter.add_variables(config.config)
+            counter.add_header(config.header)
+        elif isinstance(config, ChainConfig):
+            for layer, full in config.layers:
+                if full:
+                    counter.add_variables(layer)
+                else:
+                    counter.add_values(layer)
+            counter.add_header(config.header)
+        elif isinstance(config, ConfigSnapshot):
+            counter.add_variables(config._frozen)
+            counter.add_variables(config._changes)
+            counter.add_header(config.header)
+        else:
+            raise TypeError(f'Cannot measure memory of {type(config).__name__}')
+    return MemoryUsage(**counter.sizes)
+
+
+def measure_read_config(
+    filenames: Iterable[Union[str, Path]], keep_comments: bool = True
+) -> ReadMeasurement:
+    """Measure the memory allocated to read Phantom config files.
+
+    The memory is traced with tracemalloc while all the files are read
+    and the configs are held.
+
+    Parameters
+    ----------
+    filenames
+        The Phantom config files.
+    keep_comments
+        If False, drop the comments on load. Default is True.
+
+    Returns
+    -------
+    ReadMeasurement
+        The number of files and the memory allocated in bytes.
+    """
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        configs = [
+            PhantomConfig(
+                filename=filename, filetype='phantom', keep_comments=keep_comments
+            )
+            for filename in filenames
+        ]
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    return ReadMeasurement(len(configs), current - before, peak - before)
+
+
+class _Counter:
+    """Add up the sizes of objects, counting each object once."""
+
+    def __init__(self, deep: bool) -> None:
+        self.deep = deep
+        self.seen: Set[int] = set()
+        self.sizes: Dict[str, int] = dict.fromkeys(MemoryUsage._fields, 0)
+
+    def add(self, field: str, obj: Any, deep: bool = True) -> None:
+        """Add the size of an object, if it has not been counted."""
+        if (deep and not self.deep) or id(obj) in self.seen:
+            return
+        self.seen.add(id(obj))
+        self.sizes[field] += sys.getsizeof(obj)
+
+    def add_variables(self, variables: Dict[str, Any]) -> None:
+        """Add a dict of config variables."""
+        self.add('overhead', variables, deep=False)
+        for name, item in variables.items():
+            self.add('names', name)
+            if item is _REMOVED:
+                continue
+            self.add('overhead', item, deep=False)
+            self.add('names', item.name)
+            self.add('values', item.value)
+            self.add('comments', item.comment)
+            self.add('blocks', item.block)
+
+    def add_values(self, values: Dict[str, Any]) -> None:
+        """Add a dict of values."""
+        self.add('overhead', values, deep=False)
+        for name, value in values.items():
+            self.add('names', name)
+            self.add('values', value)
+
+    def add_header(self, header: Optional[Union[List[str], tuple]]) -> None:
+        """Add the header lines."""
+        if header is None:
+            return
+        self.add('header', header, deep=False)
+        for line in header:
+            self.add('header', line)
@@ -1,11 +1,26 @@
 """Parsers for PhantomConfig."""
 
+from __future__ import annotations
+
 import datetime
-import json
-import re
+import io
 from collections import OrderedDict
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+
+from . import schema
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from re import Pattern
+
+# The binary format is the magic bytes, one byte for the format version,
+# then the parsed config as a pickle. Only datetime classes may be loaded
+# from the pickle.
+BINARY_MAGIC = b'PHCF'
+BINARY_VERSION = 1
+BINARY_PROTOCOL = 4
+_BINARY_CLASSES = {('datetime', 'datetime'), ('datetime', 'timedelta')}
 
 
 def parse_dict_nested(dictionary: Dict[str, Dict[str, tuple]]) -> Any:
@@ -130,7 +145,7 @@ def parse_toml_file(filepath: Union[str, Path]) -> Any:
         else:
             for var, val in item.items():
                 if isinstance(val, str):
-                    if re.fullmatch(r'\d\d\d:\d\d', val):
+                    if _regex(r'\d\d\d:\d\d').fullmatch(val):
                         val = val.split(':')
                         val = datetime.timedelta(hours=int(val[0]), minutes=int(val[1]))
                 variables.append(var)
@@ -147,14 +162,15 @@ def parse_toml_file(filepath: Union[str, Path]) -> Any:
             if line.startswith('#'):
                 comment.append(line[2:])
             else:
-                variable_comment[line.split('=')[0].strip()] = '\n'.join(comment)
+                # A variable without comment lines has no comment, as
+                # written for a config loaded with keep_comments=False.
+                variable_comment[line.split('=')[0].strip()] = (
+                    '\n'.join(comment) if comment else None
+                )
                 comment = list()
 
     for var in variables:
-        if var in variable_comment:
-            comments.append(variable_comment[var])
-        else:
-            comments.append('')
+        comments.append(variable_comment.get(var))
 
     block_names = list(toml_dict.keys())
     try:
@@ -194,6 +210,8 @@ def parse_json_file(filepath: Union[str, Path]) -> Any:
     block_names : list
     (variables, values, comments, blocks) : Tuple[str, Any, str, str]
     """
+    import json
+
     with open(filepath, mode='r') as fp:
         json_dict = json.load(fp)
 
@@ -213,7 +231,7 @@ def parse_json_file(filepath: Union[str, Path]) -> Any:
         else:
             for var, val, comment in item:
                 if isinstance(val, str):
-                    if re.fullmatch(r'\d\d\d:\d\d', val):
+                    if _regex(r'\d\d\d:\d\d').fullmatch(val):
                         val = val.split(':')
                         val = datetime.timedelta(hours=int(val[0]), minutes=int(val[1]))
                 variables.append(var)
@@ -234,6 +252,76 @@ def parse_json_file(filepath: Union[str, Path]) -> Any:
     return date_time, header, block_names, (variables, values, comments, blocks)
 
 
+def parse_binary(data: Union[bytes, bytearray, memoryview]) -> Any:
+    """Parse binary config data.
+
+    Parameters
+    ----------
+    data
+        The data, as from PhantomConfig.to_bytes.
+
+    Returns
+    -------
+    date_time : datetime.datetime
+    header : list
+    block_names : list
+    (variables, values, comments, blocks) : Tuple[str, Any, str, str]
+    """
+    magic = bytes(data[: len(BINARY_MAGIC)])
+    if magic != BINARY_MAGIC:
+        raise ValueError('Cannot read binary config; bad magic bytes')
+    version = data[len(BINARY_MAGIC)]
+    if version != BINARY_VERSION:
+        raise ValueError(f'Cannot read binary config version {version}')
+    import pickle
+
+    stream = io.BytesIO(data)
+    stream.seek(len(BINARY_MAGIC) + 1)
+    try:
+        unpickler = _binary_unpickler_class()(stream)
+        date_time, header, block_names, conf = unpickler.load()
+    except (pickle.UnpicklingError, EOFError, TypeError, ValueError) as error:
+        raise ValueError(f'Cannot read binary config: {error}')
+    return date_time, header, block_names, conf
+
+
+def parse_binary_file(filepath: Union[str, Path]) -> Any:
+    """Parse binary config file.
+
+    Parameters
+    ----------
+    filepath
+        The file name or path to the binary file.
+
+    Returns
+    -------
+    date_time : datetime.datetime
+    header : list
+    block_names : list
+    (variables, values, comments, blocks) : Tuple[str, Any, str, str]
+    """
+    with open(filepath, mode='rb') as fp:
+        return parse_binary(fp.read())
+
+
+@lru_cache(maxsize=None)
+def _binary_unpickler_class() -> type:
+    """Get an unpickler which only loads the classes in a binary config.
+
+    The class is created on first use, so pickle is only imported when a
+    binary config is read.
+    """
+    import pickle
+
+    class _BinaryUnpickler(pickle.Unpickler):
+        def find_class(self, module: str, name: str) -> Any:
+            if (module, name) not in _BINARY_CLASSES:
+                raise pickle.UnpicklingError(f'Cannot load {module}.{name}')
+            return super().find_class(module, name)
+
+    return _BinaryUnpickler
+
+
 def parse_phantom_file(filepath: Union[str, Path]) -> Any:
     """Parse Phantom config file.
 
@@ -268,12 +356,13 @@ def parse_phantom_file(filepath: Union[str, Path]) -> Any:
                 _read_in_header = True
             line = line.split('#', 1)[0].strip()
             if line:
-                line, comment = line.split('!')
-                comments.append(comment.strip())
+                line, bang, comment = line.partition('!')
+                comments.append(comment.strip() if bang else None)
                 variable, value = line.split('=', 1)
-                variables.append(variable.strip())
+                variable = variable.strip()
+                variables.append(variable)
                 value = value.strip()
-                value = _convert_value_type_phantom(value)
+                value = _convert_value_type_phantom(value, schema.get_type(variable))
                 values.append(value)
                 blocks.append(block_name)
 
@@ -301,7 +390,7 @@ def _get_datetime_from_header(header: List[str]) -> Optional[datetime.datetime]:
     for line in header:
         if date_time is not None:
             break
-        matches = re.findall(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}.\d+', line)
+        matches = _regex(r'\d{2}/\d{2}/\d{4} \d{2}:\d{2}:\d{2}.\d+').findall(line)
         if len(matches) == 0:
             continue
         elif len(matches) == 1:
@@ -312,19 +401,28 @@ def _get_datetime_from_header(header: List[str]) -> Optional[datetime.datetime]:
     return date_time
 
 
-def _convert_value_type_phantom(value: str) -> Any:
+def _convert_value_type_phantom(value: str, vartype: type = None) -> Any:
     """Convert string from Phantom config to appropriate type.
 
     Parameters
     ----------
     value
         The value as a string.
+    vartype
+        The type of the variable from the schema, if known. If the value
+        cannot be converted to this type, the type is inferred instead.
 
     Returns
     -------
     value
         The value as appropriate type.
     """
+    if vartype is not None:
+        try:
+            return schema.CONVERTERS[vartype](value)
+        except ValueError:
+            pass
+
     float_regexes = [r'\d*\.\d*[Ee][-+]\d*', r'-*\d*\.\d*']
     timedelta_regexes = [r'\d\d\d:\d\d']
     int_regexes = [r'-*\d+']
@@ -335,16 +433,28 @@ def _convert_value_type_phantom(value: str) -> Any:
         return False
 
     for regex in float_regexes:
-        if re.fullmatch(regex, value):
+        if _regex(regex).fullmatch(value):
             return float(value)
 
     for regex in timedelta_regexes:
-        if re.fullmatch(regex, value):
+        if _regex(regex).fullmatch(value):
             hours, minutes = value.split(':')
             return datetime.timedelta(hours=int(hours), minutes=int(minutes))
 
     for regex in int_regexes:
-        if re.fullmatch(regex, value):
+        if _regex(regex).fullmatch(value):
             return int(value)
 
     return value
+
+
+@lru_cache(maxsize=None)
+def _regex(pattern: str) -> Pattern:
+    """Compile a regex on first use.
+
+    The regexes are compiled once, and re is only imported when a config
+    is parsed.
+    """
+    import re
+
+    return re.compile(pattern)
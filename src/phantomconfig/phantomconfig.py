@@ -3,14 +3,18 @@
 from __future__ import annotations
 
 import datetime
-import json
-import math
-import pathlib
+import itertools
+import sys
 from collections import namedtuple
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple, Union
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from .parsers import (
+    BINARY_MAGIC,
+    BINARY_PROTOCOL,
+    BINARY_VERSION,
+    parse_binary,
+    parse_binary_file,
     parse_dict_flat,
     parse_dict_nested,
     parse_json_file,
@@ -18,8 +22,65 @@ from .parsers import (
     parse_toml_file,
 )
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from .memory import MemoryUsage
+    from .snapshot import ConfigSnapshot
+
 ConfigVariable = namedtuple('ConfigVariable', ['name', 'value', 'comment', 'block'])
 
+_versions = itertools.count()
+
+
+class _ConfigDict(dict):
+    """A dict of config variables which records when it is modified.
+
+    Each modification sets a new, globally unique, version number.
+    """
+
+    __slots__ = ('version',)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.version = next(_versions)
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.version = next(_versions)
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self.version = next(_versions)
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self.version = next(_versions)
+        return value
+
+    def popitem(self):
+        item = super().popitem()
+        self.version = next(_versions)
+        return item
+
+    def setdefault(self, key, default=None):
+        value = super().setdefault(key, default)
+        self.version = next(_versions)
+        return value
+
+    def update(self, *args, **kwargs) -> None:
+        super().update(*args, **kwargs)
+        self.version = next(_versions)
+
+    def clear(self) -> None:
+        super().clear()
+        self.version = next(_versions)
+
+    def __reduce__(self):
+        # Versions are only unique within a process, so a copy gets a new
+        # version from the local counter instead of the pickled one.
+        return (_ConfigDict, (dict(self),))
+
 
 class PhantomConfig:
     """Phantom config file.
@@ -45,6 +106,9 @@ class PhantomConfig:
         datetime.datetime object.
     dictionary_type
         The type of dictionary passed: either 'nested' or 'flat'.
+    keep_comments
+        If False, drop the comments to save memory. The comments are set
+        to None. Default is True.
     """
 
     def __init__(
@@ -53,12 +117,14 @@ class PhantomConfig:
         filetype: str = None,
         dictionary: Dict = None,
         dictionary_type: str = None,
+        keep_comments: bool = True,
     ) -> None:
 
         self.name: str
         self.filepath: Path
 
-        self.config: Dict[str, ConfigVariable]
+        self._config: _ConfigDict
+        self._fingerprints: Dict[Tuple[bool, bool], Tuple[int, str]] = dict()
         self.datetime: Optional[datetime.datetime] = None
         self.header: Optional[List[str]] = None
 
@@ -73,15 +139,19 @@ class PhantomConfig:
                     filetype = 'json'
                 elif filetype.lower() == 'toml':
                     filetype = 'toml'
+                elif filetype.lower() == 'binary':
+                    filetype = 'binary'
                 else:
                     raise ValueError('Cannot determine file type.')
             else:
                 raise TypeError('filetype must be str.')
 
+            from pathlib import Path
+
             if isinstance(filename, str):
-                filepath = pathlib.Path(filename).expanduser().resolve()
+                filepath = Path(filename).expanduser().resolve()
                 filename = filepath.name
-            elif isinstance(filename, pathlib.Path):
+            elif isinstance(filename, Path):
                 filepath = filename.expanduser().resolve()
                 filename = filepath.name
             if not filepath.exists():
@@ -113,16 +183,19 @@ class PhantomConfig:
                     raise ValueError(
                         'Cannot read dictionary; is the dictionary nested?'
                     )
-            self._initialize(date_time, header, block_names, conf)
+            self._initialize(date_time, header, block_names, conf, keep_comments)
         elif filetype == 'phantom':
             date_time, header, block_names, conf = parse_phantom_file(filepath)
-            self._initialize(date_time, header, block_names, conf)
+            self._initialize(date_time, header, block_names, conf, keep_comments)
         elif filetype == 'json':
             date_time, header, block_names, conf = parse_json_file(filepath)
-            self._initialize(date_time, header, block_names, conf)
+            self._initialize(date_time, header, block_names, conf, keep_comments)
         elif filetype == 'toml':
             date_time, header, block_names, conf = parse_toml_file(filepath)
-            self._initialize(date_time, header, block_names, conf)
+            self._initialize(date_time, header, block_names, conf, keep_comments)
+        elif filetype == 'binary':
+            date_time, header, block_names, conf = parse_binary_file(filepath)
+            self._initialize(date_time, header, block_names, conf, keep_comments)
 
     def _initialize(
         self,
@@ -130,16 +203,34 @@ class PhantomConfig:
         header: List[str],
         block_names: List[str],
         conf: Tuple,
+        keep_comments: bool = True,
     ) -> None:
-        """Initialize PhantomConfig."""
+        """Initialize PhantomConfig.
+
+        Names, comments, and blocks are interned, so configs with the
+        same comments share one copy of each string.
+        """
         variables, values, comments, blocks = conf[0], conf[1], conf[2], conf[3]
+        if not keep_comments:
+            comments = itertools.repeat(None)
 
         self.header = header
         self.datetime = date_time
-        self.config = {
-            var: ConfigVariable(var, val, comment, block)
-            for var, val, comment, block in zip(variables, values, comments, blocks)
-        }
+        self._config = _ConfigDict(
+            (var, ConfigVariable(var, val, _intern(comment), _intern(block)))
+            for var, val, comment, block in zip(
+                map(_intern, variables), values, comments, blocks
+            )
+        )
+
+    @property
+    def config(self) -> Dict[str, ConfigVariable]:
+        """Dictionary of config variables, like {'variable': ConfigVariable}."""
+        return self._config
+
+    @config.setter
+    def config(self, config: Dict[str, ConfigVariable]) -> None:
+        self._config = _ConfigDict(config)
 
     @property
     def variables(self) -> List[str]:
@@ -207,6 +298,8 @@ class PhantomConfig:
         filename
             The name of the JSON output file.
         """
+        import json
+
         with open(filename, mode='w') as fp:
             json.dump(
                 self._dictionary_in_blocks(),
@@ -232,6 +325,72 @@ class PhantomConfig:
 
         return self
 
+    def write_binary(self, filename: Union[str, Path]) -> PhantomConfig:
+        """Write config to binary file.
+
+        The binary format is much faster to read and write than the text
+        formats, and preserves values, comments, blocks, header, and
+        datetime. It is intended for caching and for passing configs
+        between processes, not for long term storage.
+
+        Parameters
+        ----------
+        filename
+            The name of the binary output file.
+        """
+        with open(filename, mode='wb') as fp:
+            fp.write(self.to_bytes())
+
+        return self
+
+    def to_bytes(self) -> bytes:
+        """Convert config to bytes in the binary format.
+
+        Returns
+        -------
+        bytes
+            The config, which can be read with PhantomConfig.from_bytes.
+        """
+        import pickle
+
+        blocks = self.blocks
+        conf = (self.variables, self.values, self.comments, blocks)
+        block_names = list(dict.fromkeys(blocks))
+        return (
+            BINARY_MAGIC
+            + bytes([BINARY_VERSION])
+            + pickle.dumps(
+                (self.datetime, self.header, block_names, conf),
+                protocol=BINARY_PROTOCOL,
+            )
+        )
+
+    @classmethod
+    def from_bytes(
+        cls, data: Union[bytes, bytearray, memoryview], keep_comments: bool = True
+    ) -> PhantomConfig:
+        """Initialize PhantomConfig from bytes in the binary format.
+
+        Parameters
+        ----------
+        data
+            The data, as from PhantomConfig.to_bytes. Any buffer, like a
+            memoryview, is accepted.
+        keep_comments
+            If False, drop the comments to save memory. Default is True.
+
+        Returns
+        -------
+        PhantomConfig
+            Generated from the data.
+        """
+        date_time, header, block_names, conf = parse_binary(data)
+        config = cls.__new__(cls)
+        config.name = 'bytes'
+        config._fingerprints = dict()
+        config._initialize(date_time, header, block_names, conf, keep_comments)
+        return config
+
     def summary(self, block: str = None) -> None:
         """Print summary of config.
 
@@ -413,18 +572,128 @@ class PhantomConfig:
         value
             Set the variable to this value.
         """
-        if variable not in self.config:
-            raise ValueError(f'{variable} not in config')
+        error = self._check_value(variable, value)
+        if error is not None:
+            raise ValueError(error)
 
         tmp = self.config[variable]
+        self.config[variable] = ConfigVariable(tmp[0], value, tmp[2], tmp[3])
 
-        if not isinstance(value, type(tmp[1])):
-            raise ValueError('Value and variable are not compatible')
+        return self
 
-        self.config[variable] = ConfigVariable(tmp[0], value, tmp[2], tmp[3])
+    def update_values(self, values: Dict[str, Any]) -> PhantomConfig:
+        """Change the values of multiple variables at once.
+
+        All variables and values are validated before any change is
+        made. If any are invalid, the config is left unchanged and a
+        single error listing every problem is raised.
+
+        Parameters
+        ----------
+        values
+            A dict of variable names and their new values, like
+                {'variable': value, ...}.
+        """
+        errors = list()
+        for variable, value in values.items():
+            error = self._check_value(variable, value)
+            if error is not None:
+                errors.append(error)
+        if errors:
+            raise ValueError('; '.join(errors))
+
+        self.config.update(
+            {
+                variable: self.config[variable]._replace(value=value)
+                for variable, value in values.items()
+            }
+        )
 
         return self
 
+    def snapshot(self) -> ConfigSnapshot:
+        """Get an immutable snapshot of the config.
+
+        The snapshot is not changed by later changes to the config, and
+        can be shared between threads without locks. See
+        phantomconfig.snapshot.
+
+        Returns
+        -------
+        ConfigSnapshot
+            The snapshot.
+        """
+        from .snapshot import ConfigSnapshot
+
+        return ConfigSnapshot(self.config, self.header, self.datetime)
+
+    def memory_usage(self, deep: bool = True) -> MemoryUsage:
+        """Get the memory used by the config.
+
+        See phantomconfig.memory.
+
+        Parameters
+        ----------
+        deep
+            If True, count the names, values, comments, blocks, and
+            header lines. If False, only count the dicts and tuples which
+            hold them. Default is True.
+
+        Returns
+        -------
+        MemoryUsage
+            The memory in bytes of each part of the config.
+        """
+        from .memory import memory_usage
+
+        return memory_usage([self], deep=deep)
+
+    @contextmanager
+    def transaction(self) -> Iterator[PhantomConfig]:
+        """Modify the config in an all-or-nothing transaction.
+
+        If an exception is raised inside the context, the config,
+        header, and datetime are restored to their state on entry.
+
+        Examples
+        --------
+        >>> with config.transaction():
+        ...     config.change_value('tmax', 10.0)
+        ...     config.remove_variable('dtmax')
+        """
+        config = dict(self.config)
+        header = None if self.header is None else list(self.header)
+        date_time = self.datetime
+        try:
+            yield self
+        except BaseException:
+            self.config = config
+            self.header = header
+            self.datetime = date_time
+            raise
+
+    def _check_value(self, variable: str, value: Any) -> Optional[str]:
+        """Check a new value for a variable.
+
+        Parameters
+        ----------
+        variable
+            The name of the variable.
+        value
+            The proposed value of the variable.
+
+        Returns
+        -------
+        str or None
+            A description of the problem, or None if the value is
+            valid.
+        """
+        if variable not in self.config:
+            return f'{variable} not in config'
+        if not isinstance(value, type(self.config[variable].value)):
+            return f'{variable}: value and variable are not compatible'
+        return None
+
     def _to_phantom_lines(self, block: str = None) -> List[str]:
         """Convert config to a list of lines in Phantom style.
 
@@ -438,8 +707,6 @@ class PhantomConfig:
         list
             The config file as a list of lines.
         """
-        _length = 12
-
         only_block = None
         if block is not None:
             only_block = block
@@ -460,23 +727,7 @@ class PhantomConfig:
             else:
                 lines.append('# ' + block_name + '\n')
                 for var, val, comment in block_contents:
-                    if isinstance(val, bool):
-                        val_string = 'T'.rjust(_length) if val else 'F'.rjust(_length)
-                    elif isinstance(val, float):
-                        val_string = _phantom_float_format(
-                            val, length=_length, justify='right'
-                        )
-                    elif isinstance(val, int):
-                        val_string = f'{val:>{_length}}'
-                    elif isinstance(val, str):
-                        val_string = f'{val:>{_length}}'
-                    elif isinstance(val, datetime.timedelta):
-                        hhh = int(val.total_seconds() / 3600)
-                        mm = int((val.total_seconds() - 3600 * hhh) / 60)
-                        val_string = f'{hhh:03}:{mm:02}'.rjust(_length)
-                    else:
-                        raise ValueError('Cannot determine type')
-                    lines.append(f'{var:>20} = ' + val_string + f'   ! {comment}\n')
+                    lines.append(_phantom_variable_line(var, val, comment))
                 lines.append('\n')
 
         return lines[:-1]
@@ -509,8 +760,83 @@ class PhantomConfig:
         for entry in self.config.values():
             setattr(self, entry.name, entry)
 
+    def fingerprint(self, comments: bool = False, blocks: bool = False) -> str:
+        """Get a stable hash of the config.
+
+        The fingerprint depends on the variable names, and the type and
+        value of each variable, but not on the order of the variables,
+        or the header or datetime. It is cached until the config is
+        modified.
+
+        Parameters
+        ----------
+        comments
+            If True, the fingerprint also depends on the comments.
+        blocks
+            If True, the fingerprint also depends on the blocks.
+
+        Returns
+        -------
+        str
+            The fingerprint as a hexadecimal string.
+        """
+        cached = self._cached_fingerprint(comments, blocks)
+        if cached is not None:
+            return cached
+
+        version = self._config.version
+        fields = list()
+        for name in sorted(self._config):
+            entry = self._config[name]
+            fields.append(name)
+            fields.append(type(entry.value).__name__)
+            fields.append(repr(entry.value))
+            if comments:
+                fields.append(str(entry.comment))
+            if blocks:
+                fields.append(str(entry.block))
+        import hashlib
+
+        digest = hashlib.sha256('\x1f'.join(fields).encode()).hexdigest()
+
+        self._fingerprints[(comments, blocks)] = (version, digest)
+        return digest
+
+    def _cached_fingerprint(self, comments: bool, blocks: bool) -> Optional[str]:
+        """Get the fingerprint if it is cached and current, else None."""
+        cached = self._fingerprints.get((comments, blocks))
+        if cached is not None and cached[0] == self._config.version:
+            return cached[1]
+        return None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        """Get the state for pickle, without the cached fingerprints."""
+        state = self.__dict__.copy()
+        state['_fingerprints'] = dict()
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        """Set the state from pickle."""
+        self.__dict__.update(state)
+        self._fingerprints = dict()
+
     def __eq__(self, other):
-        """Equivalence method."""
+        """Equivalence method.
+
+        Configs are equal if they have the same variables, with equal
+        values, comments, and blocks. If both configs have a current
+        cached fingerprint and they match, the configs are equal without
+        comparing the variables.
+        """
+        if not isinstance(other, PhantomConfig):
+            return NotImplemented
+        if self is other:
+            return True
+        fingerprint = self._cached_fingerprint(True, True)
+        if fingerprint is not None and fingerprint == other._cached_fingerprint(
+            True, True
+        ):
+            return True
         return self.config == other.config
 
 
@@ -572,6 +898,77 @@ def _convert_timedelta_to_str(val: datetime.timedelta) -> str:
     return f'{hhh:03}:{mm:02}'
 
 
+def _phantom_variable_line(variable: str, value: Any, comment: str) -> str:
+    """Format a variable as a line of a Phantom config file.
+
+    Parameters
+    ----------
+    variable
+        The variable name.
+    value
+        The value.
+    comment
+        The comment.
+
+    Returns
+    -------
+    str
+        The line, including the newline.
+    """
+    return (
+        _phantom_variable_prefix(variable)
+        + _phantom_value_format(value)
+        + _phantom_comment_suffix(comment)
+    )
+
+
+def _phantom_variable_prefix(variable: str) -> str:
+    """The part of a Phantom variable line before the value."""
+    return f'{variable:>20} = '
+
+
+def _phantom_comment_suffix(comment: Optional[str]) -> str:
+    """The part of a Phantom variable line after the value."""
+    if comment is None:
+        return '\n'
+    return f'   ! {comment}\n'
+
+
+def _intern(string: Any) -> Any:
+    """Intern a string, so equal strings share one object."""
+    if isinstance(string, str):
+        return sys.intern(str(string))
+    return string
+
+
+def _phantom_value_format(val: Any, length: int = 12) -> str:
+    """Value to Phantom style value string.
+
+    Parameters
+    ----------
+    val
+        The value to convert: bool, float, int, str, or
+        datetime.timedelta.
+    length
+        The string is right justified to this length.
+
+    Returns
+    -------
+    str
+        The value as formatted str.
+    """
+    if isinstance(val, bool):
+        return 'T'.rjust(length) if val else 'F'.rjust(length)
+    elif isinstance(val, float):
+        return _phantom_float_format(val, length=length, justify='right')
+    elif isinstance(val, (int, str)):
+        return f'{val:>{length}}'
+    elif isinstance(val, datetime.timedelta):
+        return _convert_timedelta_to_str(val).rjust(length)
+    else:
+        raise ValueError('Cannot determine type')
+
+
 def _phantom_float_format(
     val: float, length: Optional[int] = None, justify: Optional[str] = None
 ):
@@ -591,7 +988,7 @@ def _phantom_float_format(
     str
         The float as formatted str.
     """
-    if math.isclose(abs(val), 0, abs_tol=1e-50):
+    if abs(val) <= 1e-50:
         string = '0.000'
     elif abs(val) < 0.001:
         string = f'{val:.3e}'
@@ -0,0 +1,247 @@
+"""Sample points in a parameter space."""
+
+import random
+from collections import namedtuple
+from typing import Any, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+Range = namedtuple('Range', ['low', 'high'])
+Range.__doc__ = """A continuous range of parameter values, from low to high.
+
+If low and high are both int, sampled values are int in the closed
+interval [low, high]. Otherwise, sampled values are float in the
+half-open interval [low, high).
+"""
+
+SAMPLERS = ('random', 'latin_hypercube', 'sobol', 'halton')
+
+# Primitive polynomials and initial direction numbers for the Sobol
+# sequence from Joe & Kuo (2008), "Constructing Sobol sequences with
+# better two-dimensional projections", new-joe-kuo-6.21201. The first
+# dimension is the van der Corput sequence. Each polynomial includes its
+# leading and trailing bits.
+_SOBOL_POLYNOMIALS = (
+    1,
+    3,
+    7,
+    11,
+    13,
+    19,
+    25,
+    37,
+    41,
+    47,
+    55,
+    59,
+    61,
+    67,
+    91,
+    97,
+    103,
+    109,
+    115,
+    131,
+    137,
+)
+_SOBOL_INITIAL = (
+    (1,),
+    (1,),
+    (1, 3),
+    (1, 3, 1),
+    (1, 1, 1),
+    (1, 1, 3, 3),
+    (1, 3, 5, 13),
+    (1, 1, 5, 5, 17),
+    (1, 1, 5, 5, 5),
+    (1, 1, 7, 11, 19),
+    (1, 1, 5, 1, 1),
+    (1, 1, 1, 3, 11),
+    (1, 3, 5, 5, 31),
+    (1, 3, 3, 9, 7, 49),
+    (1, 1, 1, 15, 21, 21),
+    (1, 3, 1, 13, 27, 49),
+    (1, 1, 1, 15, 7, 5),
+    (1, 3, 1, 15, 13, 25),
+    (1, 1, 5, 5, 19, 61),
+    (1, 3, 7, 11, 23, 15, 103),
+    (1, 3, 7, 13, 13, 15, 69),
+)
+_SOBOL_BITS = 32
+
+
+def sample_points(
+    parameters: Mapping[str, Union[List[Any], Range]],
+    sampler: str,
+    n_samples: int,
+    seed: Optional[int] = None,
+) -> Iterator[Tuple]:
+    """Sample points in a parameter space.
+
+    Parameters
+    ----------
+    parameters
+        A dict of parameters where each key is a parameter name, and
+        each value is either a list of discrete values or a Range of
+        continuous values.
+    sampler
+        The sampling strategy: 'random' (uniform random), 'latin_hypercube',
+        'sobol', or 'halton' (quasi-random low discrepancy sequences).
+    n_samples
+        The number of points to generate.
+    seed
+        The random seed. The same seed always gives the same points. For
+        'sobol' and 'halton', a seed applies a random shift to the
+        sequence; without a seed the sequence is unshifted.
+
+    Yields
+    ------
+    tuple
+        The parameter values at each point, in the order of parameters.
+    """
+    if n_samples < 0:
+        raise ValueError('n_samples must be non-negative')
+    dimension = len(parameters)
+    if sampler == 'sobol':
+        if dimension > len(_SOBOL_POLYNOMIALS):
+            raise ValueError(
+                f'sobol supports at most {len(_SOBOL_POLYNOMIALS)} parameters'
+            )
+        if n_samples > 2**_SOBOL_BITS:
+            raise ValueError(f'sobol supports at most 2**{_SOBOL_BITS} samples')
+    if sampler == 'random':
+        points = _random(dimension, n_samples, seed)
+    elif sampler == 'latin_hypercube':
+        points = _latin_hypercube(dimension, n_samples, seed)
+    elif sampler == 'sobol':
+        points = _sobol(dimension, n_samples, seed)
+    elif sampler == 'halton':
+        points = _halton(dimension, n_samples, seed)
+    else:
+        raise ValueError(f'sampler must be one of {SAMPLERS}')
+
+    specs = list(parameters.values())
+    for spec in specs:
+        if isinstance(spec, Range):
+            if not spec.high >= spec.low:
+                raise ValueError('Range high must be greater than or equal to low')
+        elif len(spec) == 0:
+            raise ValueError('Cannot sample from an empty list of values')
+
+    return (tuple(_scale(u, spec) for u, spec in zip(point, specs)) for point in points)
+
+
+def _scale(u: float, spec: Union[Sequence[Any], Range]) -> Any:
+    """Map a number in [0, 1) to a parameter value."""
+    if isinstance(spec, Range):
+        low, high = spec
+        if isinstance(low, int) and isinstance(high, int):
+            return min(low + int(u * (high - low + 1)), high)
+        return low + u * (high - low)
+    return spec[min(int(u * len(spec)), len(spec) - 1)]
+
+
+def _random(dimension: int, n_samples: int, seed: Optional[int]) -> Iterator[List]:
+    """Uniform random points in the unit hypercube."""
+    rng = random.Random(seed)
+    for _ in range(n_samples):
+        yield [rng.random() for _ in range(dimension)]
+
+
+def _latin_hypercube(
+    dimension: int, n_samples: int, seed: Optional[int]
+) -> Iterator[List]:
+    """Latin hypercube points in the unit hypercube.
+
+    Each dimension is divided into n_samples equal strata, and each
+    stratum contains exactly one point.
+    """
+    rng = random.Random(seed)
+    strata = [rng.sample(range(n_samples), n_samples) for _ in range(dimension)]
+    for idx in range(n_samples):
+        yield [
+            (strata[dim][idx] + rng.random()) / n_samples for dim in range(dimension)
+        ]
+
+
+def _halton(dimension: int, n_samples: int, seed: Optional[int]) -> Iterator[List]:
+    """Halton points in the unit hypercube."""
+    bases = _primes(dimension)
+    shift = _random_shift(dimension, seed)
+    for idx in range(1, n_samples + 1):
+        yield [
+            (_radical_inverse(idx, base) + offset) % 1.0
+            for base, offset in zip(bases, shift)
+        ]
+
+
+def _sobol(dimension: int, n_samples: int, seed: Optional[int]) -> Iterator[List]:
+    """Sobol points in the unit hypercube.
+
+    Points are generated in Gray code order (Antonov & Saleev, 1979).
+    """
+    directions = [_sobol_directions(dim) for dim in range(dimension)]
+    if seed is None:
+        shift = [0] * dimension
+    else:
+        rng = random.Random(seed)
+        shift = [rng.getrandbits(_SOBOL_BITS) for _ in range(dimension)]
+    scale = 2.0**-_SOBOL_BITS
+
+    state = [0] * dimension
+    for idx in range(n_samples):
+        if idx > 0:
+            bit = _rightmost_zero_bit(idx - 1)
+            state = [x ^ v[bit] for x, v in zip(state, directions)]
+        yield [(x ^ s) * scale for x, s in zip(state, shift)]
+
+
+def _sobol_directions(dim: int) -> List[int]:
+    """Direction numbers for one dimension of the Sobol sequence."""
+    bits = _SOBOL_BITS
+    if dim == 0:
+        return [1 << (bits - k) for k in range(1, bits + 1)]
+    polynomial = _SOBOL_POLYNOMIALS[dim]
+    degree = polynomial.bit_length() - 1
+    coefficients = (polynomial >> 1) & ((1 << (degree - 1)) - 1)
+    initial = _SOBOL_INITIAL[dim]
+    directions = [m << (bits - k) for k, m in enumerate(initial, start=1)]
+    for k in range(degree, bits):
+        value = directions[k - degree] ^ (directions[k - degree] >> degree)
+        for i in range(1, degree):
+            if (coefficients >> (degree - 1 - i)) & 1:
+                value ^= directions[k - i]
+        directions.append(value)
+    return directions
+
+
+def _rightmost_zero_bit(n: int) -> int:
+    """The index of the least significant zero bit of n."""
+    return (~n & (n + 1)).bit_length() - 1
+
+
+def _radical_inverse(n: int, base: int) -> float:
+    """Reflect the digits of n in base about the radix point."""
+    inverse, factor = 0.0, 1.0 / base
+    while n > 0:
+        n, digit = divmod(n, base)
+        inverse += digit * factor
+        factor /= base
+    return inverse
+
+
+def _random_shift(dimension: int, seed: Optional[int]) -> List[float]:
+    """A random shift modulo 1, or no shift if there is no seed."""
+    if seed is None:
+        return [0.0] * dimension
+    rng = random.Random(seed)
+    return [rng.random() for _ in range(dimension)]
+
+
+def _primes(n: int) -> List[int]:
+    """The first n prime numbers."""
+    primes: List[int] = list()
+    candidate = 2
+    while len(primes) < n:
+        if all(candidate % p for p in primes if p * p <= candidate):
+            primes.append(candidate)
+        candidate += 1
+    return primes
@@ -0,0 +1,204 @@
+"""The types of known Phantom config variables.
+
+When parsing a Phantom config file, the value of a variable in the
+schema is converted directly to its type. The type of any other variable
+is inferred from the text of its value.
+
+Examples
+--------
+>>> from phantomconfig import schema
+>>> schema.get_type('nfulldump')
+<class 'int'>
+>>> schema.register({'my_variable': float})
+>>> schema.learn(phantomconfig.read_config('reference.in'))
+"""
+
+import datetime
+from typing import Any, Callable, Dict, Iterable, Optional
+
+DEFAULT_SCHEMA: Dict[str, type] = {
+    # job name
+    'logfile': str,
+    'dumpfile': str,
+    # options controlling run time and input/output
+    'tmax': float,
+    'dtmax': float,
+    'nmax': int,
+    'nout': int,
+    'nmaxdumps': int,
+    'twallmax': datetime.timedelta,
+    'dtwallmax': datetime.timedelta,
+    'nfulldump': int,
+    'iverbose': int,
+    'rhofinal_cgs': float,
+    'dtmax_dratio': float,
+    'dtmax_max': float,
+    'dtmax_min': float,
+    'calc_erot': bool,
+    # options controlling accuracy
+    'C_cour': float,
+    'C_force': float,
+    'tolv': float,
+    'hfact': float,
+    'tolh': float,
+    'tree_accuracy': float,
+    'restartonshortest': bool,
+    # options controlling hydrodynamics, artificial dissipation
+    'alpha': float,
+    'alphau': float,
+    'alphaB': float,
+    'beta': float,
+    'avdecayconst': float,
+    # options controlling damping
+    'idamp': int,
+    'damp': float,
+    # options controlling equation of state
+    'ieos': int,
+    'mu': float,
+    'ipdv_heating': int,
+    'ishock_heating': int,
+    # options controlling sink particles
+    'icreate_sinks': int,
+    'h_soft_sinkgas': float,
+    'h_soft_sinksink': float,
+    'h_soft_sink': float,
+    'f_acc': float,
+    'h_acc': float,
+    'r_crit': float,
+    # options relating to external forces
+    'iexternalforce': int,
+    # options controlling physical viscosity
+    'irealvisc': int,
+    'shearparam': float,
+    'bulkvisc': float,
+    # options controlling dust
+    'idrag': int,
+    'grainsize': float,
+    'graindens': float,
+    'K_code': float,
+    'icut_backreaction': int,
+    'ilimitdustflux': bool,
+}
+
+
+def _convert_bool(value: str) -> bool:
+    """Convert Phantom bool string, T or F, to bool."""
+    if value == 'T':
+        return True
+    if value == 'F':
+        return False
+    raise ValueError(f'Cannot convert {value} to bool')
+
+
+def _convert_timedelta(value: str) -> datetime.timedelta:
+    """Convert Phantom time string, like HHH:MM, to timedelta."""
+    hours, minutes = value.split(':')
+    return datetime.timedelta(hours=int(hours), minutes=int(minutes))
+
+
+CONVERTERS: Dict[type, Callable[[str], Any]] = {
+    bool: _convert_bool,
+    int: int,
+    float: float,
+    str: str,
+    datetime.timedelta: _convert_timedelta,
+}
+
+_schema: Dict[str, type] = dict(DEFAULT_SCHEMA)
+
+
+def get_type(variable: str) -> Optional[type]:
+    """Get the type of a variable.
+
+    Parameters
+    ----------
+    variable
+        The name of the variable.
+
+    Returns
+    -------
+    type or None
+        The type of the variable, or None if it is not in the schema.
+    """
+    return _schema.get(variable)
+
+
+def get_schema() -> Dict[str, type]:
+    """Get a copy of the schema.
+
+    Returns
+    -------
+    dict
+        The type of each variable in the schema, like
+            {'variable': type, ...}.
+    """
+    return dict(_schema)
+
+
+def register(types: Dict[str, type]) -> None:
+    """Add variables to the schema, or change their types.
+
+    Parameters
+    ----------
+    types
+        The type of each variable, like {'variable': type, ...}. The
+        type must be bool, int, float, str, or datetime.timedelta.
+    """
+    for variable, vartype in types.items():
+        if vartype not in CONVERTERS:
+            raise ValueError(f'{variable}: cannot use type {vartype} in schema')
+    _schema.update(types)
+
+
+def unregister(variables: Iterable[str]) -> None:
+    """Remove variables from the schema.
+
+    Parameters
+    ----------
+    variables
+        The names of the variables to remove.
+    """
+    for variable in variables:
+        _schema.pop(variable, None)
+
+
+def learn(config: Any) -> None:
+    """Add the type of every variable in a reference config to the schema.
+
+    Parameters
+    ----------
+    config
+        The reference PhantomConfig.
+    """
+    register({var: type(item.value) for var, item in config.config.items()})
+
+
+def reset() -> None:
+    """Reset the schema to DEFAULT_SCHEMA."""
+    _schema.clear()
+    _schema.update(DEFAULT_SCHEMA)
+
+
+def convert(variable: str, value: str) -> Any:
+    """Convert a value string with the schema type of a variable.
+
+    Parameters
+    ----------
+    variable
+        The name of the variable.
+    value
+        The value as a string.
+
+    Returns
+    -------
+    value
+        The value as the type in the schema.
+
+    Raises
+    ------
+    KeyError
+        If the variable is not in the schema.
+    ValueError
+        If the value cannot be converted to the type in the schema.
+    """
+    return CONVERTERS[_schema[variable]](value)
@@ -0,0 +1,239 @@
+"""Share configs with worker processes through shared memory.
+
+A batch of configs is written once, in the binary format, into a single
+shared memory block. Workers receive small, cheaply pickled handles and
+load each config directly from shared memory, instead of receiving a
+pickled copy of every config through a pipe.
+
+Requires Python 3.8+ for multiprocessing.shared_memory.
+
+Examples
+--------
+>>> from multiprocessing import Pool
+>>> from phantomconfig.shared import SharedConfigs, load_shared
+>>> def analyse(handle):
+...     config = load_shared(handle)
+...     return config.get_value('tmax')
+>>> with SharedConfigs(configs) as shared, Pool() as pool:
+...     results = pool.map(analyse, shared.handles)
+"""
+
+import atexit
+import os
+import struct
+import sys
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, List
+
+from .phantomconfig import PhantomConfig
+
+SharedConfigHandle = namedtuple('SharedConfigHandle', ['name', 'index'])
+SharedConfigHandle.__doc__ = """A handle to a config in shared memory.
+
+Pass handles to worker processes and call load_shared to get the
+config.
+"""
+
+# The block starts with the number of configs, then the offset of each
+# config and of the end of the last config, as little-endian uint64.
+_OFFSET = struct.Struct('<Q')
+
+# Shared memory blocks created by this process, by name.
+_owned: Dict[str, 'SharedConfigs'] = dict()
+
+# Shared memory blocks attached to by this process, by name.
+_attached: Dict[str, '_Attachment'] = dict()
+
+_attach_lock = threading.Lock()
+
+
+class SharedConfigs:
+    """A batch of configs in a shared memory block.
+
+    The process which creates SharedConfigs owns the shared memory, and
+    must call close (or use it as a context manager) to free it once
+    the workers are finished.
+
+    Parameters
+    ----------
+    configs
+        The configs to share.
+
+    Attributes
+    ----------
+    name
+        The name of the shared memory block.
+    handles
+        A handle for each config, in order.
+    """
+
+    def __init__(self, configs: Iterable[PhantomConfig]) -> None:
+        from multiprocessing import shared_memory
+
+        data = [config.to_bytes() for config in configs]
+        offsets = [_OFFSET.size * (len(data) + 2)]
+        for item in data:
+            offsets.append(offsets[-1] + len(item))
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offsets[-1], 1))
+        buf = self._shm.buf
+        assert buf is not None
+        self._buf = buf
+        _OFFSET.pack_into(buf, 0, len(data))
+        for idx, offset in enumerate(offsets, start=1):
+            _OFFSET.pack_into(buf, idx * _OFFSET.size, offset)
+        for item, start, end in zip(data, offsets[:-1], offsets[1:]):
+            buf[start:end] = item
+
+        self.name: str = self._shm.name
+        self.handles: List[SharedConfigHandle] = [
+            SharedConfigHandle(self.name, idx) for idx in range(len(data))
+        ]
+        _owned[self.name] = self
+
+    def __len__(self) -> int:
+        """The number of configs."""
+        return len(self.handles)
+
+    def __getitem__(self, index: int) -> SharedConfigHandle:
+        """The handle of a config."""
+        return self.handles[index]
+
+    def __iter__(self) -> Iterator[SharedConfigHandle]:
+        """Iterate over the handles."""
+        return iter(self.handles)
+
+    def close(self) -> None:
+        """Free the shared memory.
+
+        Handles cannot be loaded after the shared memory is freed.
+        """
+        if _owned.pop(self.name, None) is None:
+            return
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self) -> 'SharedConfigs':
+        """Enter context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit context, freeing the shared memory."""
+        self.close()
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f'<SharedConfigs name={self.name!r} configs={len(self)}>'
+
+
+def load_shared(handle: SharedConfigHandle) -> PhantomConfig:
+    """Load a config from shared memory.
+
+    Each process attaches to a shared memory block the first time it
+    loads a config from it, and keeps it attached until release_shared
+    is called or the process exits.
+
+    Parameters
+    ----------
+    handle
+        The handle of the config, from SharedConfigs.
+
+    Returns
+    -------
+    PhantomConfig
+        The config. It is a new object, so changing it does not change
+        the config in shared memory.
+    """
+    owner = _owned.get(handle.name)
+    if owner is not None:
+        return _read(owner._buf, handle.index)
+    with _attach_lock:
+        attachment = _attached.get(handle.name)
+        if attachment is None:
+            if not _attached:
+                atexit.register(release_shared)
+            attachment = _Attachment(handle.name)
+            _attached[handle.name] = attachment
+        attachment.readers += 1
+    try:
+        return _read(attachment.buf, handle.index)
+    finally:
+        _finish_read(attachment)
+
+
+def release_shared(name: str = None) -> None:
+    """Detach this process from shared memory blocks.
+
+    Call this in long-running worker processes once the configs in a
+    block are no longer needed. Later loads attach again. If another
+    thread is loading a config from a block, the block is detached once
+    that load is finished.
+
+    Parameters
+    ----------
+    name
+        The name of the block. If None, detach from all blocks.
+    """
+    with _attach_lock:
+        names = list(_attached) if name is None else [name]
+        for _name in names:
+            attachment = _attached.pop(_name, None)
+            if attachment is None:
+                continue
+            attachment.released = True
+            if not attachment.readers:
+                attachment.close()
+
+
+def _finish_read(attachment: '_Attachment') -> None:
+    """Finish a load, closing the block if it was released meanwhile."""
+    with _attach_lock:
+        attachment.readers -= 1
+        if attachment.released and not attachment.readers:
+            attachment.close()
+
+
+def _read(buf: memoryview, index: int) -> PhantomConfig:
+    """Read the config at index from a shared memory buffer."""
+    (count,) = _OFFSET.unpack_from(buf, 0)
+    if not 0 <= index < count:
+        raise IndexError('shared config index out of range')
+    start, end = struct.unpack_from('<QQ', buf, (index + 1) * _OFFSET.size)
+    with buf[start:end] as data:
+        return PhantomConfig.from_bytes(data)
+
+
+class _Attachment:
+    """A view of a shared memory block owned by another process.
+
+    Before Python 3.13, SharedMemory registers every block it attaches
+    to with the resource tracker on POSIX systems (bpo-39959), which
+    would unlink the block when this process exits, so the block is
+    unregistered again.
+
+    readers is the number of loads in progress, and released is set by
+    release_shared; the block is closed once both allow it. Both are
+    guarded by _attach_lock.
+    """
+
+    def __init__(self, name: str) -> None:
+        from multiprocessing import shared_memory
+
+        if sys.version_info >= (3, 13):
+            self._shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if os.name == 'posix':
+                from multiprocessing import resource_tracker
+
+                resource_tracker.unregister('/' + self._shm.name, 'shared_memory')
+        buf = self._shm.buf
+        assert buf is not None
+        self.buf = buf
+        self.readers = 0
+        self.released = False
+
+    def close(self) -> None:
+        """Detach from the block."""
+        self._shm.close()
@@ -0,0 +1,318 @@
+"""Immutable snapshots of configs, safe to share between threads.
+
+A ConfigSnapshot cannot be modified. Its methods which would modify a
+PhantomConfig instead return a new snapshot, which shares the variables
+of the old one rather than copying them: a snapshot stores a frozen dict
+of variables and a small dict of the changes made to it, so each change
+costs time proportional to the number of changes. Once the changes grow
+to a fraction of the variables, they are merged into a new frozen dict.
+
+Examples
+--------
+>>> import phantomconfig as pc
+>>> template = pc.read_config('template.in').snapshot()
+>>> config = template.change_value('alpha', 0.5)
+>>> template.get_value('alpha'), config.get_value('alpha')
+(0.1, 0.5)
+>>> config.to_config().write_phantom('alpha=0.5.in')
+"""
+
+import datetime as _datetime
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from .phantomconfig import ConfigVariable, PhantomConfig
+
+if TYPE_CHECKING:
+    from .memory import MemoryUsage
+
+# Marks a variable in the changes which is removed from the frozen dict.
+_REMOVED = object()
+
+# The changes are merged into a new frozen dict when there are more than
+# this many, and more than a quarter of the number of variables.
+_MIN_MERGE = 16
+
+
+class ConfigSnapshot(Mapping):
+    """An immutable config, like {'variable': ConfigVariable}.
+
+    Get a snapshot with PhantomConfig.snapshot, and a mutable copy with
+    ConfigSnapshot.to_config.
+
+    Parameters
+    ----------
+    variables
+        The config variables, like {'variable': ConfigVariable}. The dict
+        is copied.
+    header
+        The lines of the header.
+    datetime
+        The time stamp of the config.
+    """
+
+    __slots__ = ('_frozen', '_changes', '_len', 'header', 'datetime')
+
+    _frozen: Dict[str, ConfigVariable]
+    _changes: Dict[str, Any]
+    _len: int
+    header: Optional[Tuple[str, ...]]
+    datetime: Optional[_datetime.datetime]
+
+    def __init__(
+        self,
+        variables: Dict[str, ConfigVariable],
+        header: List[str] = None,
+        datetime: _datetime.datetime = None,
+    ) -> None:
+        frozen = dict(variables)
+        self._set(
+            frozen=frozen,
+            changes={},
+            length=len(frozen),
+            header=tuple(header) if header is not None else None,
+            date_time=datetime,
+        )
+
+    def _set(
+        self,
+        frozen: Dict[str, ConfigVariable],
+        changes: Dict[str, Any],
+        length: int,
+        header: Optional[Tuple[str, ...]],
+        date_time: Optional[_datetime.datetime],
+    ) -> None:
+        """Set the attributes of a new snapshot."""
+        object.__setattr__(self, '_frozen', frozen)
+        object.__setattr__(self, '_changes', changes)
+        object.__setattr__(self, '_len', length)
+        object.__setattr__(self, 'header', header)
+        object.__setattr__(self, 'datetime', date_time)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        """Snapshots cannot be modified."""
+        raise AttributeError('ConfigSnapshot is immutable')
+
+    def __delattr__(self, name: str) -> None:
+        """Snapshots cannot be modified."""
+        raise AttributeError('ConfigSnapshot is immutable')
+
+    def __getitem__(self, variable: str) -> ConfigVariable:
+        """Get a config variable."""
+        item = self._changes.get(variable)
+        if item is None:
+            return self._frozen[variable]
+        if item is _REMOVED:
+            raise KeyError(variable)
+        return item
+
+    def __contains__(self, variable: object) -> bool:
+        """Check if a variable is in the config."""
+        if not isinstance(variable, str):
+            return False
+        item = self._changes.get(variable)
+        if item is None:
+            return variable in self._frozen
+        return item is not _REMOVED
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the variables in order."""
+        changes = self._changes
+        for variable in self._frozen:
+            if changes.get(variable) is not _REMOVED:
+                yield variable
+        for variable, item in changes.items():
+            if variable not in self._frozen and item is not _REMOVED:
+                yield variable
+
+    def __len__(self) -> int:
+        """The number of variables."""
+        return self._len
+
+    def __reduce__(self):
+        return (ConfigSnapshot, (dict(self.items()), self.header, self.datetime))
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f'<ConfigSnapshot variables={len(self)}>'
+
+    @property
+    def variables(self) -> List[str]:
+        """List of variables."""
+        return list(self)
+
+    def get_value(self, variable: str) -> Any:
+        """Get the value of a variable.
+
+        Parameters
+        ----------
+        variable
+            The name of the variable.
+
+        Returns
+        -------
+        The value of the variable.
+        """
+        return self[variable].value
+
+    def change_value(self, variable: str, value: Any) -> 'ConfigSnapshot':
+        """Get a snapshot with the value of a variable changed.
+
+        Parameters
+        ----------
+        variable
+            Change the value of this variable.
+        value
+            Set the variable to this value.
+
+        Returns
+        -------
+        ConfigSnapshot
+            The new snapshot.
+        """
+        return self.update_values({variable: value})
+
+    def update_values(self, values: Dict[str, Any]) -> 'ConfigSnapshot':
+        """Get a snapshot with the values of multiple variables changed.
+
+        All variables and values are validated, and a single error
+        listing every problem is raised if any are invalid.
+
+        Parameters
+        ----------
+        values
+            A dict of variable names and their new values, like
+                {'variable': value, ...}.
+
+        Returns
+        -------
+        ConfigSnapshot
+            The new snapshot.
+        """
+        errors = list()
+        for variable, value in values.items():
+            if variable not in self:
+                errors.append(f'{variable} not in config')
+            elif not isinstance(value, type(self[variable].value)):
+                errors.append(f'{variable}: value and variable are not compatible')
+        if errors:
+            raise ValueError('; '.join(errors))
+        return self._with_changes(
+            {
+                variable: self[variable]._replace(value=value)
+                for variable, value in values.items()
+            }
+        )
+
+    def add_variable(
+        self,
+        variable: str,
+        value: Any,
+        comment: str = None,
+        block: str = None,
+    ) -> 'ConfigSnapshot':
+        """Get a snapshot with a variable added.
+
+        Parameters
+        ----------
+        variable
+            The name of the variable.
+        value
+            The value of the variable.
+        comment
+            The comment string describing the variable.
+        block
+            The block to which the variable is associated.
+
+        Returns
+        -------
+        ConfigSnapshot
+            The new snapshot.
+        """
+        if comment is None:
+            comment = 'No description'
+        if block is None:
+            block = 'Miscellaneous'
+        item = ConfigVariable(variable, value, comment, block)
+        if self._changes.get(variable) is _REMOVED:
+            # Merge, so that the variable is added at the end, not in its
+            # old position.
+            return self._merged()._with_changes({variable: item})
+        return self._with_changes({variable: item})
+
+    def remove_variable(self, variable: str) -> 'ConfigSnapshot':
+        """Get a snapshot with a variable removed.
+
+        Parameters
+        ----------
+        variable
+            The variable to remove.
+
+        Returns
+        -------
+        ConfigSnapshot
+            The new snapshot.
+        """
+        if variable not in self:
+            raise KeyError(variable)
+        return self._with_changes({variable: _REMOVED})
+
+    def to_config(self) -> PhantomConfig:
+        """Get a mutable copy of the snapshot.
+
+        Returns
+        -------
+        PhantomConfig
+            A new config with the variables, header, and datetime.
+        """
+        config = PhantomConfig.__new__(PhantomConfig)
+        config.name = 'snapshot'
+        config._fingerprints = dict()
+        config.header = list(self.header) if self.header is not None else None
+        config.datetime = self.datetime
+        config.config = dict(self.items())
+        return config
+
+    def memory_usage(self, deep: bool = True) -> 'MemoryUsage':
+        """Get the memory used by the snapshot.
+
+        Variables shared with other snapshots are counted in full. See
+        phantomconfig.memory.
+
+        Parameters
+        ----------
+        deep
+            If True, count the names, values, comments, blocks, and
+            header lines. If False, only count the dicts and tuples which
+            hold them. Default is True.
+
+        Returns
+        -------
+        MemoryUsage
+            The memory in bytes of each part of the snapshot.
+        """
+        from .memory import memory_usage
+
+        return memory_usage([self], deep=deep)
+
+    def _with_changes(self, changes: Dict[str, Any]) -> 'ConfigSnapshot':
+        """Get a new snapshot with more changes."""
+        length = self._len
+        for variable, item in changes.items():
+            if item is _REMOVED:
+                length -= variable in self
+            else:
+                length += variable not in self
+        merged_changes = {**self._changes, **changes}
+        snapshot = ConfigSnapshot.__new__(ConfigSnapshot)
+        snapshot._set(self._frozen, merged_changes, length, self.header, self.datetime)
+        if len(merged_changes) > max(_MIN_MERGE, len(self._frozen) // 4):
+            return snapshot._merged()
+        return snapshot
+
+    def _merged(self) -> 'ConfigSnapshot':
+        """Get the same snapshot with the changes merged."""
+        snapshot = ConfigSnapshot.__new__(ConfigSnapshot)
+        frozen = dict(self.items())
+        snapshot._set(frozen, {}, len(frozen), self.header, self.datetime)
+        return snapshot
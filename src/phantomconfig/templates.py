@@ -0,0 +1,119 @@
+"""Precompiled templates for rendering many variants of a config."""
+
+from typing import Any, Dict, Iterable, List
+
+from .phantomconfig import (
+    PhantomConfig,
+    _phantom_comment_suffix,
+    _phantom_value_format,
+    _phantom_variable_line,
+    _phantom_variable_prefix,
+)
+
+
+class CompiledTemplate:
+    """A Phantom config file with slots for the values of some variables.
+
+    All constant text is rendered once, when the template is compiled.
+    Rendering a file only formats the values in the slots and joins the
+    pieces.
+
+    Use compile_template to create a CompiledTemplate.
+
+    Attributes
+    ----------
+    variables
+        The names of the variables with slots.
+    """
+
+    def __init__(self, config: PhantomConfig, variable_slots: Iterable[str]) -> None:
+        variables = tuple(dict.fromkeys(variable_slots))
+        missing = [variable for variable in variables if variable not in config.config]
+        if missing:
+            raise ValueError('; '.join(f'{var} not in config' for var in missing))
+        self.variables = variables
+
+        slot_lines = {
+            _phantom_variable_line(*config.config[var][:3]): var for var in variables
+        }
+        parts: List[bytes] = list()
+        positions: Dict[str, int] = dict()
+        types: Dict[str, type] = dict()
+        constant: List[str] = list()
+        for line in config._to_phantom_lines():
+            variable = slot_lines.get(line)
+            if variable is None:
+                constant.append(line)
+                continue
+            _, value, comment, _ = config.config[variable]
+            constant.append(_phantom_variable_prefix(variable))
+            parts.append(''.join(constant).encode())
+            positions[variable] = len(parts)
+            types[variable] = type(value)
+            parts.append(_phantom_value_format(value).encode())
+            constant = [_phantom_comment_suffix(comment)]
+        parts.append(''.join(constant).encode())
+
+        self._parts = parts
+        self._positions = positions
+        self._types = types
+
+    def render(self, values: Dict[str, Any]) -> bytes:
+        """Render the file with values in the slots.
+
+        Parameters
+        ----------
+        values
+            A dict of variable names and their values, like
+                {'variable': value, ...}.
+            Slots not in values keep the value in the template.
+
+        Returns
+        -------
+        bytes
+            The rendered Phantom config file.
+        """
+        parts = self._parts.copy()
+        errors = list()
+        for variable, value in values.items():
+            position = self._positions.get(variable)
+            if position is None:
+                errors.append(f'{variable} is not a variable slot')
+            elif not isinstance(value, self._types[variable]):
+                errors.append(f'{variable}: value and variable are not compatible')
+            else:
+                parts[position] = _phantom_value_format(value).encode()
+        if errors:
+            raise ValueError('; '.join(errors))
+        return b''.join(parts)
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        return f'<CompiledTemplate variables={list(self.variables)}>'
+
+
+def compile_template(
+    config: PhantomConfig, variable_slots: Iterable[str]
+) -> CompiledTemplate:
+    """Compile a config into a template with slots for some variables.
+
+    Parameters
+    ----------
+    config
+        The template config. Changing it after it is compiled does not
+        change the compiled template.
+    variable_slots
+        The names of the variables whose values change between renders.
+
+    Returns
+    -------
+    CompiledTemplate
+        The compiled template. Call its render method with a dict of
+        values to get the Phantom file as bytes.
+
+    Examples
+    --------
+    >>> template = compile_template(config, ['alpha', 'beta'])
+    >>> data = template.render({'alpha': 0.1, 'beta': 2.0})
+    """
+    return CompiledTemplate(config, variable_slots)
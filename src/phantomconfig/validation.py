@@ -0,0 +1,416 @@
+"""Validate many sets of config values at once.
+
+A Validator compiles rules for variables once: the type of a variable,
+a range of values, a set of allowed values, and relations between
+variables like 'tmax >= dtmax'. It then checks all points of a sweep in
+one pass per rule. If numpy is available, each rule is evaluated on
+whole columns of values.
+
+Examples
+--------
+>>> from phantomconfig.validation import Validator
+>>> validator = Validator(
+...     ranges={'alpha': (0.0, 1.0)},
+...     allowed={'ieos': [1, 2, 3]},
+...     relations=['tmax >= dtmax'],
+... )
+>>> result = validator.validate({'alpha': [0.1, 2.0], 'tmax': [1.0, 1.0]},
+...                             defaults={'ieos': 1, 'dtmax': 0.1})
+>>> result.mask
+array([ True, False])
+"""
+
+import math
+from collections import namedtuple
+from functools import reduce
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Sequence, Tuple, Union
+
+from . import schema
+from .expressions import Expression
+
+ValidationResult = namedtuple('ValidationResult', ['mask', 'errors'])
+ValidationResult.__doc__ = """The result of validating points.
+
+mask is a boolean array (or list, without numpy) which is True for each
+valid point. errors is a list of (index, message) tuples for each
+problem found.
+"""
+
+_MAX_REPORTED_ERRORS = 10
+
+
+class Validator:
+    """Rules for the values of config variables.
+
+    Parameters
+    ----------
+    types
+        A dict of variable names and their types. Variables not in types
+        are checked against the type schema, if use_schema is True.
+    ranges
+        A dict of variable names and (low, high) tuples. Values must be
+        in the closed interval [low, high]. Either bound may be None.
+    allowed
+        A dict of variable names and the collection of allowed values.
+    relations
+        A list of expressions, as strings or callables, which must be
+        True for each point, like 'tmax >= dtmax'. See
+        phantomconfig.expressions.Expression.
+    use_schema
+        If True, check the type of variables not in types against the
+        type schema. Default is True.
+    use_numpy
+        If True, evaluate rules on numpy arrays. Default is to use numpy
+        if it is available.
+    """
+
+    def __init__(
+        self,
+        *,
+        types: Dict[str, type] = None,
+        ranges: Dict[str, Tuple[Any, Any]] = None,
+        allowed: Dict[str, Iterable[Any]] = None,
+        relations: List[Union[str, Callable]] = None,
+        use_schema: bool = True,
+        use_numpy: bool = None,
+    ) -> None:
+        self.types = dict(types or {})
+        self.ranges = dict(ranges or {})
+        for variable, bounds in self.ranges.items():
+            if len(bounds) != 2:
+                raise ValueError(f'{variable}: range must be (low, high)')
+        self.allowed = {
+            variable: list(values) for variable, values in (allowed or {}).items()
+        }
+        self.relations = [Expression(relation) for relation in relations or []]
+        self.use_schema = use_schema
+        if use_numpy is None:
+            use_numpy = _numpy() is not None
+        elif use_numpy and _numpy() is None:
+            raise ImportError('use_numpy requires numpy')
+        self.use_numpy = use_numpy
+
+    def validate(
+        self,
+        points: Union[Mapping[str, Sequence[Any]], Iterable[Mapping[str, Any]]],
+        defaults: Dict[str, Any] = None,
+    ) -> ValidationResult:
+        """Validate points.
+
+        Parameters
+        ----------
+        points
+            Either a dict of variable names and sequences of values, one
+            per point, or an iterable of dicts of variable names and
+            values, one per point.
+        defaults
+            Values of variables which are the same at every point, e.g.
+            from the template config. Rules on variables which are not
+            in points or defaults are not checked.
+
+        Returns
+        -------
+        ValidationResult
+            A named tuple of a mask, which is True for valid points, and
+            a list of (index, message) for each error.
+        """
+        columns, size = _to_columns(points)
+        defaults = dict(defaults or {})
+        np = _numpy() if self.use_numpy else None
+        if np is not None:
+            columns = {name: _as_array(np, column) for name, column in columns.items()}
+
+        checks: List[Tuple[str, Any, str]] = list()
+        for variable, column in columns.items():
+            vartype = self.types.get(variable)
+            if vartype is None and self.use_schema:
+                vartype = schema.get_type(variable)
+            if vartype is not None:
+                ok = _check_type(np, column, vartype)
+                message = f'value and variable are not compatible, expected {vartype}'
+                checks.append((variable, ok, message))
+        for variable, (low, high) in self.ranges.items():
+            message = f'not in range [{low}, {high}]'
+            if variable in columns:
+                ok = _check_range(np, columns[variable], low, high)
+                checks.append((variable, ok, message))
+            elif variable in defaults:
+                ok = _in_range(defaults[variable], low, high)
+                checks.append((variable, ok, message))
+        for variable, values in self.allowed.items():
+            message = f'not one of {values}'
+            if variable in columns:
+                ok = _check_allowed(np, columns[variable], values)
+                checks.append((variable, ok, message))
+            elif variable in defaults:
+                ok = defaults[variable] in values
+                checks.append((variable, ok, message))
+        for relation in self.relations:
+            ok = _check_relation(np, relation, columns, defaults, size)
+            if ok is not None:
+                checks.append((str(relation.expression), ok, 'is False'))
+
+        if np is not None:
+            mask = np.ones(size, dtype=bool)
+            for _, ok, _ in checks:
+                mask &= ok
+        else:
+            mask = [True] * size
+            for _, ok, _ in checks:
+                if isinstance(ok, bool):
+                    ok = [ok] * size
+                mask = [m and o for m, o in zip(mask, ok)]
+
+        errors = list()
+        if not all(mask):
+            for name, ok, message in checks:
+                for index in _failures(np, ok, size):
+                    value = _value(columns, defaults, name, index)
+                    errors.append((index, f'{name}{value}: {message}'))
+            errors.sort(key=lambda error: error[0])
+        return ValidationResult(mask, errors)
+
+    def check(
+        self,
+        points: Union[Mapping[str, Sequence[Any]], Iterable[Mapping[str, Any]]],
+        defaults: Dict[str, Any] = None,
+    ) -> None:
+        """Raise an error if any point is invalid.
+
+        Parameters
+        ----------
+        points
+            The points to validate. See validate.
+        defaults
+            Values of variables which are the same at every point. See
+            validate.
+
+        Raises
+        ------
+        ValueError
+            Listing the invalid points.
+        """
+        mask, errors = self.validate(points, defaults)
+        if errors:
+            n_invalid = len(mask) - int(sum(mask))
+            messages = [
+                f'point {index}: {message}'
+                for index, message in errors[:_MAX_REPORTED_ERRORS]
+            ]
+            if len(errors) > _MAX_REPORTED_ERRORS:
+                messages.append(f'and {len(errors) - _MAX_REPORTED_ERRORS} more')
+            raise ValueError(
+                f'{n_invalid} of {len(mask)} points are invalid; ' + '; '.join(messages)
+            )
+
+    def __repr__(self) -> str:
+        """Repr method."""
+        n_rules = (
+            len(self.types) + len(self.ranges) + len(self.allowed) + len(self.relations)
+        )
+        return f'<Validator rules={n_rules}>'
+
+
+def _numpy():
+    """Get numpy if it is available."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def _to_columns(
+    points: Union[Mapping[str, Sequence[Any]], Iterable[Mapping[str, Any]]],
+) -> Tuple[Dict[str, List[Any]], int]:
+    """Convert points to a dict of columns and the number of points."""
+    if isinstance(points, Mapping):
+        columns = {name: list(values) for name, values in points.items()}
+        sizes = {len(column) for column in columns.values()}
+        if len(sizes) > 1:
+            raise ValueError('Each variable must have one value per point')
+        return columns, sizes.pop() if sizes else 0
+    rows = list(points)
+    names = dict.fromkeys(name for row in rows for name in row)
+    columns = dict()
+    for name in names:
+        if not all(name in row for row in rows):
+            raise ValueError(f'{name} is not set at every point')
+        columns[name] = [row[name] for row in rows]
+    return columns, len(rows)
+
+
+def _as_array(np, column: List[Any]):
+    """Convert a column of values to a numpy array."""
+    types = {type(value) for value in column}
+    if len(types) == 1 and types.pop() in (bool, int, float):
+        return np.asarray(column)
+    array = np.empty(len(column), dtype=object)
+    array[:] = column
+    return array
+
+
+def _check_type(np, column, vartype: type):
+    """Check the type of each value in a column."""
+    if np is not None:
+        kind = {bool: 'b', int: 'i', float: 'f'}.get(vartype)
+        if kind is not None and column.dtype.kind == kind:
+            return np.ones(len(column), dtype=bool)
+        # tolist gives Python scalars, so e.g. bool is an int as without numpy
+        return np.fromiter(
+            (isinstance(value, vartype) for value in column.tolist()),
+            dtype=bool,
+            count=len(column),
+        )
+    return [isinstance(value, vartype) for value in column]
+
+
+def _check_range(np, column, low, high):
+    """Check that each value in a column is in the closed interval."""
+    if np is not None and column.dtype.kind in 'biuf':
+        ok = np.ones(len(column), dtype=bool)
+        if low is not None:
+            ok &= column >= low
+        if high is not None:
+            ok &= column <= high
+        return ok
+    ok = [_in_range(value, low, high) for value in column]
+    return np.asarray(ok, dtype=bool) if np is not None else ok
+
+
+def _in_range(value: Any, low: Any, high: Any) -> bool:
+    """Check that a value is in the closed interval [low, high]."""
+    try:
+        return (low is None or value >= low) and (high is None or value <= high)
+    except TypeError:
+        return False
+
+
+def _check_allowed(np, column, values: List[Any]):
+    """Check that each value in a column is allowed."""
+    if np is not None and column.dtype.kind in 'biuf':
+        return np.isin(column, values)
+    try:
+        allowed = set(values)
+        ok = [value in allowed for value in column]
+    except TypeError:
+        ok = [value in values for value in column]
+    return np.asarray(ok, dtype=bool) if np is not None else ok
+
+
+def _check_relation(
+    np,
+    relation: Expression,
+    columns: Dict[str, Any],
+    defaults: Dict[str, Any],
+    size: int,
+):
+    """Evaluate a relation at each point.
+
+    Returns None if the relation uses variables which are not set.
+    """
+    namespace = {**defaults, **columns}
+    names = relation.names if relation.names is not None else namespace.keys()
+    if not all(name in namespace for name in names):
+        return None
+    if not any(name in columns for name in names):
+        return bool(relation({name: namespace[name] for name in names}))
+    if np is not None:
+        # Floating point errors, e.g. division by zero, are raised so that
+        # the relation is evaluated at each point, as without numpy.
+        try:
+            with np.errstate(all='raise'):
+                ok = relation(namespace, _numpy_functions(np))
+            ok = np.broadcast_to(np.asarray(ok), (size,))
+            if ok.dtype.kind == 'b':
+                return ok.copy()
+        except (TypeError, ValueError, FloatingPointError):
+            pass
+        # Evaluate at each point with Python values, not numpy scalars.
+        columns = {name: column.tolist() for name, column in columns.items()}
+    ok = [
+        bool(
+            relation(
+                {
+                    name: columns[name][idx] if name in columns else defaults[name]
+                    for name in names
+                }
+            )
+        )
+        for idx in range(size)
+    ]
+    return np.asarray(ok, dtype=bool) if np is not None else ok
+
+
+def _numpy_functions(np) -> Dict[str, Any]:
+    """The expression functions, as numpy functions on arrays."""
+    return {
+        'abs': np.abs,
+        'min': _numpy_reduce(np.minimum),
+        'max': _numpy_reduce(np.maximum),
+        'round': _numpy_round(np),
+        'sqrt': np.sqrt,
+        'exp': np.exp,
+        'log': _numpy_log(np),
+        'log10': np.log10,
+        'sin': np.sin,
+        'cos': np.cos,
+        'tan': np.tan,
+        'pi': math.pi,
+    }
+
+
+def _numpy_round(np) -> Callable:
+    """Round arrays like round: to int arrays if ndigits is None."""
+
+    def _round(value, ndigits=None):
+        if ndigits is None:
+            return np.round(value).astype(int)
+        return np.round(value, ndigits)
+
+    return _round
+
+
+def _numpy_reduce(ufunc) -> Callable:
+    """Apply a binary ufunc to any number of arguments, like min or max.
+
+    Calling the ufunc directly would take a third argument as the output
+    array.
+    """
+
+    def _reduce(*values):
+        return reduce(ufunc, values)
+
+    return _reduce
+
+
+def _numpy_log(np) -> Callable:
+    """Take logarithms of arrays like math.log, with an optional base."""
+
+    def _log(value, base=None):
+        if base is None:
+            return np.log(value)
+        return np.log(value) / np.log(base)
+
+    return _log
+
+
+def _failures(np, ok, size: int) -> Iterable[int]:
+    """The indices of the points which fail a check."""
+    if isinstance(ok, bool):
+        return [] if ok else range(size)
+    if np is not None:
+        return np.flatnonzero(~ok).tolist()
+    return [idx for idx, value in enumerate(ok) if not value]
+
+
+def _value(columns: Dict[str, Any], defaults: Dict[str, Any], name: str, index: int):
+    """A description of the value of a variable at a point."""
+    if name in columns:
+        value = columns[name][index]
+        if hasattr(value, 'item'):
+            value = value.item()
+        return f'={value!r}'
+    if name in defaults:
+        return f'={defaults[name]!r}'
+    return ''
@@ -0,0 +1,287 @@
+"""Watch config files and reload them when they change.
+
+Files are checked by size and modification time, and only files which
+have changed are parsed again. If the optional inotify_simple package is
+available (Linux only), the watcher wakes as soon as a file in a watched
+directory is written, instead of waiting for the next poll.
+
+Examples
+--------
+>>> from phantomconfig.watch import watch
+>>> def on_change(change):
+...     if 'tmax' in change.diff:
+...         print(change.path, change.diff['tmax'])
+>>> watch(['runs'], on_change, interval=60.0)
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from .phantomconfig import PhantomConfig
+
+ConfigChange = namedtuple('ConfigChange', ['path', 'config', 'diff'])
+ConfigChange.__doc__ = """A change to a watched config file.
+
+path is the path of the file. config is the new PhantomConfig, or None
+if the file was removed. diff is a dict like {variable: (old, new)} of
+the values which changed, where old or new is None if the variable was
+added or removed.
+"""
+
+SUFFIXES = ('.in', '.setup')
+
+_FILETYPES = {'.json': 'json', '.toml': 'toml', '.bin': 'binary'}
+
+
+def diff(
+    old: Optional[PhantomConfig], new: Optional[PhantomConfig]
+) -> Dict[str, Tuple[Any, Any]]:
+    """Compare the values of two configs.
+
+    Parameters
+    ----------
+    old
+        The old config, or None.
+    new
+        The new config, or None.
+
+    Returns
+    -------
+    dict
+        The values which differ, like {variable: (old, new)}. If a
+        variable is only in one config, the other value is None.
+    """
+    old_config = old.config if old is not None else {}
+    new_config = new.config if new is not None else {}
+    changes = dict()
+    for variable, item in old_config.items():
+        new_item = new_config.get(variable)
+        if new_item is None:
+            changes[variable] = (item.value, None)
+        elif type(new_item.value) is not type(item.value):
+            changes[variable] = (item.value, new_item.value)
+        elif new_item.value != item.value:
+            changes[variable] = (item.value, new_item.value)
+    for variable, item in new_config.items():
+        if variable not in old_config:
+            changes[variable] = (None, item.value)
+    return changes
+
+
+class ConfigWatcher:
+    """Track a set of config files and report changes.
+
+    The files are scanned when the watcher is created. Each call to poll
+    reports the files which have changed since the last scan.
+
+    Parameters
+    ----------
+    paths
+        Config files or directories to watch. Directories are searched
+        recursively for files with a suffix in suffixes.
+    suffixes
+        The suffixes of config files to watch in directories. Default is
+        ('.in', '.setup').
+    use_inotify
+        If True, use inotify_simple to wait for changes. Default is to
+        use it if it is available.
+    """
+
+    def __init__(
+        self,
+        paths: Iterable[Union[str, Path]],
+        *,
+        suffixes: Iterable[str] = SUFFIXES,
+        use_inotify: bool = None,
+    ) -> None:
+        self.paths = [Path(path).expanduser().resolve() for path in paths]
+        self.suffixes = tuple(suffixes)
+        self.configs: Dict[Path, PhantomConfig] = dict()
+        self._stats: Dict[Path, Optional[Tuple[int, int]]] = dict()
+        self._inotify: Any = None
+        self._watched: Set[str] = set()
+        if use_inotify is None or use_inotify:
+            try:
+                import inotify_simple
+            except ImportError:
+                if use_inotify:
+                    raise
+            else:
+                self._inotify = inotify_simple.INotify()
+                self._inotify_flags = (
+                    inotify_simple.flags.CLOSE_WRITE
+                    | inotify_simple.flags.MOVED_TO
+                    | inotify_simple.flags.CREATE
+                    | inotify_simple.flags.DELETE
+                )
+        self.poll()
+
+    def poll(self) -> List[ConfigChange]:
+        """Check the files for changes.
+
+        Returns
+        -------
+        list
+            A ConfigChange for each file which was added, modified, or
+            removed. Files which are empty or cannot be parsed, e.g.
+            because they are being written, are retried on the next poll.
+        """
+        changes = list()
+        found = set()
+        for path, stat in self._scan():
+            found.add(path)
+            key = (stat.st_size, stat.st_mtime_ns)
+            if self._stats.get(path) == key:
+                continue
+            if stat.st_size == 0:
+                # The file is probably being written.
+                self._stats[path] = None
+                continue
+            try:
+                config = PhantomConfig(
+                    filename=path, filetype=_FILETYPES.get(path.suffix, 'phantom')
+                )
+            except (OSError, ValueError, IndexError, KeyError):
+                self._stats[path] = None
+                continue
+            self._stats[path] = key
+            old = self.configs.get(path)
+            self.configs[path] = config
+            _diff = diff(old, config)
+            if old is None or _diff:
+                changes.append(ConfigChange(path, config, _diff))
+        for path in list(self._stats):
+            if path not in found:
+                del self._stats[path]
+                old = self.configs.pop(path, None)
+                if old is not None:
+                    changes.append(ConfigChange(path, None, diff(old, None)))
+        return changes
+
+    def wait(self, timeout: float, stop: threading.Event = None) -> None:
+        """Wait until a file may have changed, or for timeout seconds.
+
+        Parameters
+        ----------
+        timeout
+            The maximum time to wait in seconds.
+        stop
+            If set during the wait, return early. Without inotify this is
+            checked continuously; with inotify, at least every second.
+        """
+        if self._inotify is None:
+            if stop is not None:
+                stop.wait(timeout)
+            else:
+                time.sleep(timeout)
+            return
+        remaining = timeout
+        while remaining > 0 and not (stop is not None and stop.is_set()):
+            step = min(remaining, 1.0)
+            if self._inotify.read(timeout=int(step * 1000)):
+                return
+            remaining -= step
+
+    def close(self) -> None:
+        """Stop using inotify, if it is used."""
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._watched.clear()
+
+    def _scan(self) -> Iterator[Tuple[Path, os.stat_result]]:
+        """Find the files to watch, and their stat."""
+        for root in self.paths:
+            if root.is_dir():
+                for dirpath, _, filenames in os.walk(root):
+                    self._watch_directory(dirpath)
+                    for filename in filenames:
+                        if filename.endswith(self.suffixes):
+                            path = Path(dirpath) / filename
+                            try:
+                                yield path, path.stat()
+                            except OSError:
+                                continue
+            else:
+                self._watch_directory(root.parent)
+                try:
+                    yield root, root.stat()
+                except OSError:
+                    continue
+
+    def _watch_directory(self, directory: Union[str, Path]) -> None:
+        """Add an inotify watch on a directory."""
+        directory = str(directory)
+        if self._inotify is None or directory in self._watched:
+            return
+        try:
+            self._inotify.add_watch(directory, self._inotify_flags)
+        except OSError:
+            return
+        self._watched.add(directory)
+
+    def __enter__(self) -> 'ConfigWatcher':
+        """Enter context."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit context."""
+        self.close()
+
+
+def watch(
+    paths: Iterable[Union[str, Path]],
+    callback: Callable[[ConfigChange], Any],
+    *,
+    interval: float = 60.0,
+    stop: threading.Event = None,
+    suffixes: Iterable[str] = SUFFIXES,
+    use_inotify: bool = None,
+) -> None:
+    """Watch config files and call a function when they change.
+
+    The files are scanned once at the start, and changes after that are
+    reported. This function blocks until stop is set; run it in a
+    thread to watch in the background.
+
+    Parameters
+    ----------
+    paths
+        Config files or directories to watch. Directories are searched
+        recursively for files with a suffix in suffixes.
+    callback
+        Called with a ConfigChange for each file which is added,
+        modified, or removed.
+    interval
+        The time between polls in seconds. Default is 60.
+    stop
+        A threading.Event to stop watching. If None, watch forever.
+    suffixes
+        The suffixes of config files to watch in directories. Default is
+        ('.in', '.setup').
+    use_inotify
+        If True, use inotify_simple to wake on changes. Default is to
+        use it if it is available.
+    """
+    with ConfigWatcher(paths, suffixes=suffixes, use_inotify=use_inotify) as watcher:
+        while stop is None or not stop.is_set():
+            watcher.wait(interval, stop)
+            if stop is not None and stop.is_set():
+                break
+            for change in watcher.poll():
+                callback(change)
@@ -0,0 +1,46 @@
+"""Testing the asyncio interface."""
+
+import asyncio
+import pathlib
+
+import phantomconfig as pc
+from phantomconfig import aio
+
+from .stub import test_data
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def test_read_write_phantom_config(tmp_path):
+    """Test reading and writing Phantom config files."""
+
+    async def main():
+        conf = await aio.read_config(test_phantom_file)
+        await aio.write_phantom(conf, tmp_path / 'tmp.in')
+        await aio.write_json(conf, tmp_path / 'tmp.json')
+        return await asyncio.gather(
+            aio.read_config(tmp_path / 'tmp.in'), aio.read_json(tmp_path / 'tmp.json')
+        )
+
+    for conf in asyncio.run(main()):
+        assert conf.config == test_data.config
+        assert conf.header == test_data.header
+        assert conf.datetime == test_data._datetime
+
+
+def test_parameter_sweep(tmp_path):
+    """Test generating a parameter sweep."""
+    template = pc.read_config(test_phantom_file)
+    asyncio.run(
+        aio.parameter_sweep(
+            filename='config.in',
+            template=template,
+            parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2, 3]},
+            output_dir=tmp_path,
+            max_concurrency=2,
+        )
+    )
+    assert len(list(tmp_path.iterdir())) == 6
+    conf = pc.read_config(tmp_path / 'alpha_0.1-nfulldump_2' / 'config.in')
+    assert conf.get_value('alpha') == 0.1
+    assert conf.get_value('nfulldump') == 2
@@ -0,0 +1,52 @@
+"""Testing layered configs."""
+
+import pathlib
+
+import pytest
+
+import phantomconfig as pc
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def test_merge(tmp_path):
+    """Test resolving variables through layers of overrides."""
+    base = pc.read_config(test_phantom_file)
+    project = pc.read_dict(
+        {
+            'tmax': [
+                500.0,
+                'project end time',
+                'options controlling run time and input/output',
+            ]
+        },
+        dtype='flat',
+    )
+    project.write_json(tmp_path / 'project.json')
+
+    chain = pc.merge(base, tmp_path / 'project.json', {'dtmax': 2.0, 'new': 1})
+    assert chain.get_value('tmax') == 500.0
+    assert chain['tmax'].comment == 'project end time'
+    assert chain['dtmax'].value == 2.0
+    assert chain['dtmax'].comment == base.config['dtmax'].comment
+    assert chain['new'].block == 'Miscellaneous'
+    assert chain.variables == base.variables + ['new']
+    assert base.get_value('dtmax') == 1.0
+
+    run = chain.new_child({'tmax': 1.0})
+    assert run.get_value('tmax') == 1.0
+    assert chain.get_value('tmax') == 500.0
+
+    base.change_value('nfulldump', 5)
+    assert run.get_value('nfulldump') == 5
+
+    flat = run.flatten()
+    assert flat.get_value('tmax') == 1.0
+    assert flat.config['dtmax'] == run['dtmax']
+    assert flat.header == base.header
+    assert len(flat.config) == len(run)
+
+    with pytest.raises(ValueError):
+        pc.merge(base, {'tmax': 'long'})
+    with pytest.raises(KeyError):
+        run.get_value('not_a_variable')
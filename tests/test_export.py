@@ -0,0 +1,92 @@
+"""Testing exporting configs to a table."""
+
+import csv
+import pathlib
+import shutil
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig.export import export_tree
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def _make_tree(root):
+    for idx, tmax in enumerate([100.0, 200.0]):
+        directory = root / f'run{idx}'
+        directory.mkdir()
+        conf = pc.read_config(test_phantom_file)
+        conf.change_value('tmax', tmax)
+        conf.write_phantom(directory / 'config.in')
+    shutil.copy(test_phantom_file, root / 'run1' / 'notes.txt')
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_export_tree_csv(tmp_path, max_workers):
+    """Test exporting a tree of configs to CSV."""
+    _make_tree(tmp_path)
+    out = tmp_path / 'runs.csv'
+    assert export_tree(tmp_path, out, max_workers=max_workers) == 2
+    with open(out) as fp:
+        rows = list(csv.DictReader(fp))
+    assert [row['path'] for row in rows] == ['run0/config.in', 'run1/config.in']
+    assert [float(row['tmax']) for row in rows] == [100.0, 200.0]
+    assert rows[0]['twallmax'] == '000:00'
+    assert rows[0]['datetime'].startswith('1999-01-01')
+
+    with pytest.raises(ValueError):
+        export_tree(tmp_path, tmp_path / 'runs.xlsx')
+
+
+def test_export_tree_npz(tmp_path):
+    """Test exporting a tree of configs to npz."""
+    np = pytest.importorskip('numpy')
+    _make_tree(tmp_path)
+    export_tree(tmp_path, tmp_path / 'runs.npz', max_workers=1)
+    data = np.load(tmp_path / 'runs.npz')
+    assert data['tmax'].tolist() == [100.0, 200.0]
+    assert data['nfulldump'].dtype.kind == 'i'
+    assert data['path'].tolist() == ['run0/config.in', 'run1/config.in']
+
+
+def test_export_tree_parquet(tmp_path):
+    """Test exporting a tree of configs to Parquet."""
+    pq = pytest.importorskip('pyarrow.parquet')
+    _make_tree(tmp_path)
+    export_tree(tmp_path, tmp_path / 'runs.parquet', max_workers=1)
+    table = pq.read_table(tmp_path / 'runs.parquet')
+    assert table.column('tmax').to_pylist() == [100.0, 200.0]
+
+
+def test_export_tree_npz_missing(tmp_path):
+    """Test that an npz export of a mixed tree loads without pickle."""
+    np = pytest.importorskip('numpy')
+    _make_tree(tmp_path)
+    (tmp_path / 'run1' / 'config.setup').write_text(
+        '# setup file\n'
+        '\n'
+        '# setup\n'
+        '                 nx =          64    ! particles\n'
+        '           usesinks =           T    ! sinks\n'
+        '            logfile =                ! log\n'
+    )
+    export_tree(tmp_path, tmp_path / 'runs.npz', max_workers=1)
+    data = np.load(tmp_path / 'runs.npz')
+    assert all(data[name].dtype != object for name in data.files)
+    assert data['path'].tolist() == [
+        'run0/config.in',
+        'run1/config.in',
+        'run1/config.setup',
+    ]
+    assert data['header'].tolist()[2] == 'setup file'
+    assert np.isnat(data['datetime'][2])
+    assert data['datetime_missing'].tolist() == [False, False, True]
+    assert data['nx'].dtype.kind == 'f'
+    assert data['nx'][2] == 64 and np.isnan(data['nx'][0])
+    assert data['usesinks'].tolist() == [False, False, True]
+    assert data['usesinks_missing'].tolist() == [True, True, False]
+    assert data['logfile'].tolist()[2] == ''
+    assert np.isnan(data['tmax'][2]) and data['tmax_missing'].tolist()[2]
+    assert data['nfulldump'].dtype.kind == 'f'
+    assert 'path_missing' not in data.files
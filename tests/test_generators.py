@@ -0,0 +1,462 @@
+"""Testing parameter sweeps."""
+
+import pathlib
+import tarfile
+import zipfile
+from itertools import product
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig.validation import Validator
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def test_parameter_sweep(tmp_path):
+    """Test generating a parameter sweep."""
+    template = pc.read_config(test_phantom_file)
+    pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2, 3]},
+        dependent_parameters={'alpha': [{'beta': 1.0}, {'beta': 2.0}]},
+        output_dir=tmp_path,
+    )
+    directories = sorted(path.name for path in tmp_path.iterdir())
+    assert len(directories) == 6
+    conf = pc.read_config(tmp_path / 'alpha_0.2-nfulldump_3' / 'config.in')
+    assert conf.get_value('alpha') == 0.2
+    assert conf.get_value('nfulldump') == 3
+    assert conf.get_value('beta') == 2.0
+
+
+def test_sweep_points():
+    """Test iterating over sweep points."""
+    points = pc.sweep_points(
+        parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2]},
+        dummy_parameters=['nfulldump'],
+    )
+    assert list(points) == [
+        ('alpha_0.1-nfulldump_1', {'alpha': 0.1}),
+        ('alpha_0.1-nfulldump_2', {'alpha': 0.1}),
+        ('alpha_0.2-nfulldump_1', {'alpha': 0.2}),
+        ('alpha_0.2-nfulldump_2', {'alpha': 0.2}),
+    ]
+
+
+def test_sweep_points_derived():
+    """Test derived parameters from expressions and callables."""
+    points = list(
+        pc.sweep_points(
+            parameters={'tmax': [10.0, 20.0], 'nfulldump': [1, 2]},
+            dummy_parameters=['nfulldump'],
+            dependent_parameters={'tmax': [{'beta': 1.0}, {'beta': 2.0}]},
+            derived_parameters={
+                'dtmax': 'tmax / 100',
+                'nout': lambda nfulldump: 10 * nfulldump,
+                'alpha': 'beta + dtmax',
+                'iverbose': 'round(tmax / 10)',
+            },
+        )
+    )
+    assert points[3] == (
+        'tmax_20.0-nfulldump_2',
+        {
+            'tmax': 20.0,
+            'beta': 2.0,
+            'dtmax': 0.2,
+            'nout': 20,
+            'alpha': 2.2,
+            'iverbose': 2,
+        },
+    )
+    assert [type(value) for value in points[0][1].values()] == [
+        float,
+        float,
+        float,
+        int,
+        float,
+        int,
+    ]
+
+    with pytest.raises(ValueError):
+        pc.sweep_points(parameters={'tmax': [1.0]}, derived_parameters={'a': 'b'})
+    with pytest.raises(ValueError):
+        pc.sweep_points(parameters={'tmax': [1.0]}, derived_parameters={'tmax': '1'})
+
+
+def test_parameter_sweep_derived(tmp_path):
+    """Test writing derived parameters in a sweep."""
+    template = pc.read_config(test_phantom_file)
+    pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'tmax': [10.0, 20.0]},
+        derived_parameters={'dtmax': 'tmax / 100'},
+        output_dir=tmp_path,
+    )
+    conf = pc.read_config(tmp_path / 'tmax_20.0' / 'config.in')
+    assert conf.get_value('dtmax') == 0.2
+
+
+def test_sweep_points_derived_functions():
+    """Test derived parameters with functions of several arguments."""
+    points = pc.sweep_points(
+        parameters={'a': [1.0, 2.0], 'b': [5.0, 0.5], 'c': [10.0]},
+        derived_parameters={
+            'biggest': 'max(a, b, c)',
+            'smallest': 'min(a, b, c)',
+            'decades': 'log(c * a, 10)',
+        },
+    )
+    values = [updates for _, updates in points]
+    assert [point['biggest'] for point in values] == [10.0] * 4
+    assert [point['smallest'] for point in values] == [1.0, 0.5, 2.0, 0.5]
+    assert [point['decades'] for point in values] == pytest.approx(
+        [1.0, 1.0, 1.30103, 1.30103]
+    )
+
+
+def test_sweep_points_sharded():
+    """Test that shards partition the sweep."""
+    parameters = {'alpha': [0.1, 0.2, 0.3], 'nfulldump': [1, 2, 3, 4, 5]}
+    points = [point[0] for point in pc.sweep_points(parameters=parameters)]
+    shards = [
+        [
+            point[0]
+            for point in pc.sweep_points(
+                parameters=parameters, shard_index=idx, shard_count=4
+            )
+        ]
+        for idx in range(4)
+    ]
+    assert sum(len(shard) for shard in shards) == len(points)
+    assert sorted(sum(shards, [])) == sorted(points)
+
+
+def test_parameter_sweep_incremental(tmp_path):
+    """Test that an incremental sweep only writes changed files."""
+    template = pc.read_config(test_phantom_file)
+    kwargs = dict(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2, 3]},
+        output_dir=tmp_path,
+        incremental=True,
+    )
+    assert pc.parameter_sweep(**kwargs) == (6, 0, 0)
+    path = tmp_path / 'alpha_0.1-nfulldump_1' / 'config.in'
+    mtime = path.stat().st_mtime_ns
+
+    assert pc.parameter_sweep(**kwargs) == (0, 0, 6)
+    assert path.stat().st_mtime_ns == mtime
+
+    template.change_value('beta', 3.0)
+    assert pc.parameter_sweep(**kwargs) == (0, 6, 0)
+    assert pc.read_config(path).get_value('beta') == 3.0
+
+
+def test_parameter_sweep_nested_prefix(tmp_path, monkeypatch):
+    """Test re-running a sweep into nested directories."""
+    template = pc.read_config(test_phantom_file)
+    kwargs = dict(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2, 3]},
+        prefix='runs/',
+        output_dir=tmp_path,
+    )
+    assert pc.parameter_sweep(**kwargs) == (6, 0, 0)
+    assert len(list((tmp_path / 'runs').iterdir())) == 6
+
+    mkdirs = list()
+    mkdir = pathlib.Path.mkdir
+
+    def _mkdir(self, *args, **kwargs):
+        mkdirs.append(self)
+        return mkdir(self, *args, **kwargs)
+
+    monkeypatch.setattr(pathlib.Path, 'mkdir', _mkdir)
+    assert pc.parameter_sweep(**kwargs) == (0, 6, 0)
+    assert mkdirs == []
+
+
+def test_parameter_sweep_fsync(tmp_path):
+    """Test writing a sweep with each fsync policy."""
+    template = pc.read_config(test_phantom_file)
+    for fsync in ('none', 'file', 'end'):
+        result = pc.parameter_sweep(
+            filename='config.in',
+            template=template,
+            parameters={'alpha': [0.1, 0.2]},
+            output_dir=tmp_path / fsync,
+            fsync=fsync,
+        )
+        assert result == (2, 0, 0)
+        files = sorted(path.name for path in (tmp_path / fsync).rglob('*'))
+        assert files == ['alpha_0.1', 'alpha_0.2', 'config.in', 'config.in']
+
+    with pytest.raises(ValueError):
+        pc.parameter_sweep(
+            filename='config.in',
+            template=template,
+            parameters={'alpha': [0.1, 0.2]},
+            output_dir=tmp_path,
+            fsync='always',
+        )
+
+
+def test_parameter_sweep_sampler(tmp_path):
+    """Test generating a sampled parameter sweep."""
+    template = pc.read_config(test_phantom_file)
+    result = pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={
+            'alpha': pc.Range(0.1, 1.0),
+            'nfulldump': [1, 2],
+            'label': ['a', 'b'],
+        },
+        dummy_parameters=['label'],
+        dependent_parameters={'nfulldump': [{'beta': 1.0}, {'beta': 2.0}]},
+        output_dir=tmp_path,
+        sampler='sobol',
+        n_samples=8,
+    )
+    assert result.created == 8
+    for path in tmp_path.glob('*/config.in'):
+        conf = pc.read_config(path)
+        assert 0.1 <= conf.get_value('alpha') < 1.0
+        assert conf.get_value('beta') == float(conf.get_value('nfulldump'))
+
+    with pytest.raises(ValueError):
+        pc.parameter_sweep(
+            filename='config.in',
+            template=template,
+            parameters={'alpha': pc.Range(0.1, 1.0)},
+            output_dir=tmp_path,
+        )
+
+
+def test_sweep_points_constraints():
+    """Test that constraints remove points from the sweep."""
+    parameters = {'a': [1, 2, 3], 'b': [1, 2, 3], 'c': [1, 2]}
+    points = pc.sweep_points(
+        parameters=parameters,
+        constraints=['a <= b', lambda a, c: a + c != 4],
+    )
+    expected = [
+        f'a_{a}-b_{b}-c_{c}'
+        for a, b, c in product(*parameters.values())
+        if a <= b and a + c != 4
+    ]
+    assert [point[0] for point in points] == expected
+
+
+def test_sweep_points_constraints_prune():
+    """Test that a constraint on a prefix of parameters prunes the product."""
+    calls = list()
+
+    def small(a):
+        calls.append(a)
+        return a == 1
+
+    parameters = {'a': [1, 2, 3], 'b': list(range(100))}
+    points = list(pc.sweep_points(parameters=parameters, constraints=[small]))
+    assert len(points) == 100
+    assert calls == [1, 2, 3]
+
+    with pytest.raises(ValueError):
+        pc.sweep_points(parameters=parameters, constraints=['a < d'])
+    with pytest.raises(ValueError):
+        pc.sweep_points(parameters=parameters, constraints=['__import__("os")'])
+
+
+@pytest.mark.parametrize('archive', ['sweep.tar', 'sweep.tar.gz', 'sweep.zip'])
+def test_parameter_sweep_archive(tmp_path, archive):
+    """Test writing a parameter sweep into an archive."""
+    template = pc.read_config(test_phantom_file)
+    result = pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'nfulldump': [1, 2, 3]},
+        output_dir=tmp_path,
+        archive=archive,
+    )
+    assert result.created == 6
+    assert [path.name for path in tmp_path.iterdir()] == [archive]
+
+    if archive.endswith('.zip'):
+        with zipfile.ZipFile(tmp_path / archive) as zf:
+            names = zf.namelist()
+            zf.extractall(tmp_path / 'extract')
+    else:
+        with tarfile.open(tmp_path / archive) as tf:
+            names = tf.getnames()
+            tf.extractall(tmp_path / 'extract')
+    assert len(names) == 6
+    assert 'alpha_0.2-nfulldump_3/config.in' in names
+    conf = pc.read_config(tmp_path / 'extract' / 'alpha_0.2-nfulldump_3' / 'config.in')
+    assert conf.get_value('alpha') == 0.2
+    assert conf.get_value('nfulldump') == 3
+
+
+def test_parameter_sweep_templates(tmp_path):
+    """Test generating multiple files per point in one pass."""
+    setup = pc.read_dict(
+        {
+            'dust': {
+                'ndust': (1, 'number of dust species'),
+                'densright': (1.0, 'density on the right'),
+            }
+        }
+    )
+    setup.header = ['input file for test setup']
+    infile = pc.read_config(test_phantom_file)
+    result = pc.parameter_sweep(
+        templates={
+            'test.setup': (setup, ['alpha']),
+            'test.in': (infile, ['ndust']),
+        },
+        parameters={'ndust': [1, 3], 'alpha': [0.1, 0.2]},
+        dependent_parameters={'ndust': [{'densright': 8.0}, {'densright': 16.0}]},
+        output_dir=tmp_path,
+    )
+    assert result.created == 8
+    directory = tmp_path / 'ndust_3-alpha_0.2'
+    assert sorted(path.name for path in directory.iterdir()) == [
+        'test.in',
+        'test.setup',
+    ]
+    setup = pc.read_config(directory / 'test.setup')
+    assert setup.get_value('ndust') == 3
+    assert setup.get_value('densright') == 16.0
+    infile = pc.read_config(directory / 'test.in')
+    assert infile.get_value('alpha') == 0.2
+    assert 'densright' not in infile.config
+
+    with pytest.raises(ValueError):
+        pc.parameter_sweep(
+            templates={'test.in': (infile, [])},
+            parameters={'alpha': [0.1, 0.2]},
+            dependent_parameters={'alpha': [{'densright': 8.0}, {'densright': 16.0}]},
+            output_dir=tmp_path,
+        )
+
+
+@pytest.mark.parametrize('dedupe', ['hardlink', 'symlink'])
+def test_parameter_sweep_dedupe(tmp_path, dedupe):
+    """Test that identical files are written once and linked."""
+    template = pc.read_config(test_phantom_file)
+    result = pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'label': ['a', 'b', 'c']},
+        dummy_parameters=['label'],
+        output_dir=tmp_path,
+        dedupe=dedupe,
+    )
+    assert result.created == 6
+    assert len(list((tmp_path / '.store').iterdir())) == 2
+    path_a = tmp_path / 'alpha_0.2-label_a' / 'config.in'
+    path_b = tmp_path / 'alpha_0.2-label_b' / 'config.in'
+    assert path_a.read_bytes() == path_b.read_bytes()
+    assert pc.read_config(path_a).get_value('alpha') == 0.2
+    if dedupe == 'hardlink':
+        assert path_a.stat().st_ino == path_b.stat().st_ino
+    else:
+        assert path_a.is_symlink()
+
+
+def test_parameter_sweep_dedupe_archive(tmp_path):
+    """Test that identical files are stored as links in a tar archive."""
+    template = pc.read_config(test_phantom_file)
+    pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'alpha': [0.1, 0.2], 'label': ['a', 'b', 'c']},
+        dummy_parameters=['label'],
+        output_dir=tmp_path,
+        archive='sweep.tar',
+        dedupe='hardlink',
+    )
+    with tarfile.open(tmp_path / 'sweep.tar') as tf:
+        members = tf.getmembers()
+        assert len(members) == 6
+        assert sum(member.islnk() for member in members) == 4
+        assert tf.extractfile('alpha_0.1-label_c/config.in').read() == (
+            tf.extractfile('alpha_0.1-label_a/config.in').read()
+        )
+
+
+def test_parameter_sweep_validator(tmp_path):
+    """Test validating a sweep before writing."""
+    template = pc.read_config(test_phantom_file)
+    validator = Validator(relations=['tmax >= 10 * dtmax'])
+    with pytest.raises(ValueError):
+        pc.parameter_sweep(
+            filename='config.in',
+            template=template,
+            parameters={'tmax': [5.0, 20.0], 'dtmax': [1.0, 0.1]},
+            output_dir=tmp_path,
+            validator=validator,
+        )
+    assert list(tmp_path.iterdir()) == []
+
+    pc.parameter_sweep(
+        filename='config.in',
+        template=template,
+        parameters={'tmax': [10.0, 20.0]},
+        output_dir=tmp_path,
+        validator=validator,
+    )
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_parameter_sweep_manifest(tmp_path):
+    """Test that materializing a manifest gives the same files as a sweep."""
+    setup = pc.read_config(test_phantom_file)
+    kwargs = dict(
+        templates={
+            'config.in': (pc.read_config(test_phantom_file), ['nfulldump']),
+            'config.setup': (setup, []),
+        },
+        parameters={
+            'alpha': [0.1, 0.2],
+            'nfulldump': [1, 2, 3],
+            'logfile': ['', 'x.log'],
+        },
+        dependent_parameters={'alpha': [{'beta': 1.0}, {'beta': 2.0, 'tmax': 5.0}]},
+        derived_parameters={'dtmax': 'alpha * 10'},
+    )
+    pc.parameter_sweep(output_dir=tmp_path / 'files', **kwargs)
+    result = pc.parameter_sweep(
+        output_dir=tmp_path / 'manifest', manifest='sweep.csv', **kwargs
+    )
+    assert result.created == 3
+    assert sorted(path.name for path in (tmp_path / 'manifest').iterdir()) == [
+        'sweep.config.in.bin',
+        'sweep.config.setup.bin',
+        'sweep.csv',
+    ]
+
+    directories = [
+        point[0] for point in pc.sweep_points(parameters=kwargs['parameters'])
+    ]
+    for index, directory in enumerate(directories):
+        paths = pc.materialize(
+            tmp_path / 'manifest' / 'sweep.csv', index, output_dir=tmp_path / 'jobs'
+        )
+        assert [path.name for path in paths] == ['config.in', 'config.setup']
+        for path in paths:
+            expected = tmp_path / 'files' / directory / path.name
+            assert path == tmp_path / 'jobs' / directory / path.name
+            assert path.read_bytes() == expected.read_bytes()
+
+    with pytest.raises(ValueError):
+        pc.materialize(tmp_path / 'manifest' / 'sweep.csv', len(directories))
+    with pytest.raises(ValueError):
+        pc.parameter_sweep(
+            output_dir=tmp_path, manifest='sweep.csv', archive='sweep.tar', **kwargs
+        )
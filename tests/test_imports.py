@@ -0,0 +1,80 @@
+"""Testing the import time of phantomconfig."""
+
+import os
+import pathlib
+import subprocess
+import sys
+
+import phantomconfig as pc
+
+# The budget for the time spent in phantomconfig's own modules on import
+# phantomconfig, as a fraction of the time the interpreter takes to
+# import site at startup in the same run, as reported by -X importtime.
+# Stdlib modules imported by phantomconfig, e.g. typing, are not counted.
+IMPORT_TIME_BUDGET = 1.0
+
+# Modules which must not be imported by import phantomconfig.
+LAZY_MODULES = (
+    'phantomconfig.generators',
+    'phantomconfig.chain',
+    'phantomconfig.templates',
+    'hashlib',
+    'json',
+    'pathlib',
+    'pickle',
+    'tarfile',
+    'zipfile',
+)
+
+
+def _run(code, tmp_path, *options):
+    """Run Python code in a new interpreter, with bytecode cached in tmp_path."""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPYCACHEPREFIX'] = str(tmp_path)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(pathlib.Path(pc.__file__).parents[1]), env.get('PYTHONPATH', '')]
+    )
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_lazy_imports(tmp_path):
+    """Test that heavy modules are only imported when they are used."""
+    code = (
+        'import sys; before = set(sys.modules); import phantomconfig; '
+        'print(*sorted(set(sys.modules) - before))'
+    )
+    imported = set(_run(code, tmp_path).stdout.split())
+    assert 'phantomconfig.phantomconfig' in imported
+    assert imported.isdisjoint(LAZY_MODULES), imported & set(LAZY_MODULES)
+
+    assert pc.parameter_sweep.__module__ == 'phantomconfig.generators'
+    assert pc.schema.get_type('nfulldump') is int
+    assert 'parameter_sweep' in dir(pc)
+
+
+def test_import_time(tmp_path):
+    """Test that the time to import phantomconfig is within the budget."""
+    _run('import phantomconfig', tmp_path)
+    ratios = list()
+    for _ in range(5):
+        stderr = _run('import phantomconfig', tmp_path, '-X', 'importtime').stderr
+        own, site = 0, None
+        for line in stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) != 3:
+                continue
+            name = fields[2].strip()
+            if name == 'phantomconfig' or name.startswith('phantomconfig.'):
+                own += int(fields[0].split(':')[1])
+            elif name == 'site':
+                site = int(fields[1])
+        assert site
+        ratios.append(own / site)
+    assert min(ratios) < IMPORT_TIME_BUDGET
@@ -0,0 +1,53 @@
+"""Testing memory usage."""
+
+import pathlib
+import shutil
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig.memory import MemoryUsage, measure_read_config, memory_usage
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def test_memory_usage():
+    """Test the memory used by configs."""
+    conf = pc.read_config(test_phantom_file)
+    usage = conf.memory_usage()
+    assert isinstance(usage, MemoryUsage)
+    assert usage.total == sum(usage)
+    assert all(size > 0 for size in usage)
+
+    shallow = conf.memory_usage(deep=False)
+    assert shallow.overhead == usage.overhead
+    assert shallow.total == shallow.overhead + shallow.header < usage.total
+
+    # Interned strings are counted once across configs.
+    other = pc.read_config(test_phantom_file)
+    both = memory_usage([conf, other])
+    assert both.comments == usage.comments
+    assert both.blocks == usage.blocks
+    assert both.overhead > usage.overhead
+
+    no_comments = pc.read_config(test_phantom_file, keep_comments=False)
+    assert no_comments.memory_usage().comments < usage.comments
+
+    chain = pc.merge(conf, {'tmax': 200.0})
+    assert chain.memory_usage().values > usage.values
+    assert conf.snapshot().memory_usage().names == usage.names
+
+    with pytest.raises(TypeError):
+        memory_usage([conf.config])
+
+
+def test_measure_read_config(tmp_path):
+    """Test measuring the memory to read config files."""
+    paths = list()
+    for idx in range(10):
+        path = tmp_path / f'config_{idx}.in'
+        shutil.copy(test_phantom_file, path)
+        paths.append(path)
+    measurement = measure_read_config(paths)
+    assert measurement.n_files == 10
+    assert 0 < measurement.current <= measurement.peak
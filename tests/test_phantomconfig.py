@@ -1,6 +1,9 @@
 """Testing phantomconfig."""
 
 import pathlib
+import pickle
+
+import pytest
 
 import phantomconfig as pc
 
@@ -103,6 +106,24 @@ def test_write_toml_config():
     tmp_file.unlink()
 
 
+def test_write_binary_config(tmp_path):
+    """Test writing and reading binary config files."""
+    conf = pc.read_config(test_phantom_file)
+    conf.write_binary(tmp_path / 'tmp.bin')
+    conf = pc.read_binary(tmp_path / 'tmp.bin')
+    assert conf.config == test_data.config
+    assert conf.header == test_data.header
+    assert conf.datetime == test_data._datetime
+
+    conf = pc.PhantomConfig.from_bytes(conf.to_bytes())
+    assert conf.config == test_data.config
+    assert conf.header == test_data.header
+    assert conf.datetime == test_data._datetime
+
+    with pytest.raises(ValueError):
+        pc.PhantomConfig.from_bytes(b'not a config')
+
+
 def test_add_value():
     """Testing adding, removing, modifying values."""
     conf = pc.read_config(test_phantom_file)
@@ -124,3 +145,122 @@ def test_change_variable():
     hfact_prev = conf.config['hfact'].value
     conf.change_value('hfact', 1.2)
     assert conf.config['hfact'].value != hfact_prev
+
+
+def test_update_values():
+    """Test changing multiple values at once."""
+    conf = pc.read_config(test_phantom_file)
+    conf.update_values({'hfact': 1.2, 'nfulldump': 5, 'logfile': 'new.log'})
+    assert conf.get_value('hfact') == 1.2
+    assert conf.get_value('nfulldump') == 5
+    assert conf.get_value('logfile') == 'new.log'
+
+
+def test_update_values_is_atomic():
+    """Test that invalid updates leave the config unchanged."""
+    conf = pc.read_config(test_phantom_file)
+    with pytest.raises(ValueError) as excinfo:
+        conf.update_values({'hfact': 1.2, 'nfulldump': 5.0, 'not_a_variable': 1})
+    assert 'nfulldump' in str(excinfo.value)
+    assert 'not_a_variable' in str(excinfo.value)
+    assert conf.config == test_data.config
+
+
+def test_transaction():
+    """Test that a failed transaction is rolled back."""
+    conf = pc.read_config(test_phantom_file)
+    with pytest.raises(ValueError):
+        with conf.transaction():
+            conf.change_value('hfact', 1.2)
+            conf.remove_variable('dtmax')
+            conf.change_value('tmax', 'not a float')
+    assert conf.config == test_data.config
+
+    with conf.transaction():
+        conf.change_value('hfact', 1.2)
+    assert conf.get_value('hfact') == 1.2
+
+
+def test_fingerprint():
+    """Test config fingerprints and equality."""
+    conf = pc.read_config(test_phantom_file)
+    conf_json = pc.read_json(test_json_file)
+    assert conf.fingerprint() == conf_json.fingerprint()
+    assert conf == conf_json
+
+    fingerprint = conf.fingerprint()
+    conf.change_value('hfact', 1.2)
+    assert conf.fingerprint() != fingerprint
+    assert conf != conf_json
+
+    conf.config['hfact'] = conf_json.config['hfact']
+    assert conf.fingerprint() == fingerprint
+    assert conf == conf_json
+
+    conf.config['hfact'] = conf.config['hfact']._replace(comment='new comment')
+    assert conf.fingerprint() == fingerprint
+    assert conf.fingerprint(comments=True) != conf_json.fingerprint(comments=True)
+    assert conf != conf_json
+
+    # Equality compares values, not fingerprints, which include types.
+    conf = pc.read_config(test_phantom_file)
+    conf_int = pc.read_config(test_phantom_file)
+    conf_int.config['hfact'] = conf_int.config['hfact']._replace(value=1)
+    conf.change_value('hfact', 1.0)
+    assert conf.fingerprint(True, True) != conf_int.fingerprint(True, True)
+    assert conf == conf_int
+
+
+def test_fingerprint_pickle():
+    """Test fingerprints of a pickled config are not stale."""
+    conf = pc.read_config(test_phantom_file)
+    reference = pc.read_config(test_phantom_file)
+    assert conf == reference
+
+    copy = pickle.loads(pickle.dumps(conf))
+    assert not copy._fingerprints
+    assert copy == reference
+    copy.change_value('hfact', 1.2)
+    assert copy != reference
+    assert copy._config.version != conf._config.version
+
+
+def test_compile_template(tmp_path):
+    """Test rendering a compiled template."""
+    conf = pc.read_config(test_phantom_file)
+    template = pc.compile_template(conf, ['hfact', 'nfulldump', 'logfile'])
+    values = {'hfact': 1.2, 'nfulldump': 5, 'logfile': 'new.log'}
+    data = template.render(values)
+
+    conf.update_values(values)
+    conf.write_phantom(tmp_path / 'config.in')
+    assert data == (tmp_path / 'config.in').read_bytes()
+    assert template.render({}) != data
+
+    with pytest.raises(ValueError):
+        template.render({'hfact': 1})
+    with pytest.raises(ValueError):
+        template.render({'alpha': 0.1})
+    with pytest.raises(ValueError):
+        pc.compile_template(conf, ['not_a_variable'])
+
+
+def test_interned_and_dropped_comments(tmp_path):
+    """Test sharing comment strings and dropping comments on load."""
+    conf1 = pc.read_config(test_phantom_file)
+    conf2 = pc.read_json(test_json_file)
+    assert conf1.config['tmax'].comment is conf2.config['tmax'].comment
+    assert conf1.config['tmax'].block is conf2.config['tmax'].block
+
+    conf = pc.read_config(test_phantom_file, keep_comments=False)
+    assert set(conf.comments) == {None}
+    assert conf.values == conf1.values
+    conf.write_phantom(tmp_path / 'no_comments.in')
+    assert '!' not in (tmp_path / 'no_comments.in').read_text()
+    conf = pc.read_config(tmp_path / 'no_comments.in')
+    assert conf.values == conf1.values
+    assert set(conf.comments) == {None}
+
+    pytest.importorskip('tomlkit')
+    conf.write_toml(tmp_path / 'no_comments.toml')
+    assert pc.read_toml(tmp_path / 'no_comments.toml') == conf
@@ -0,0 +1,41 @@
+"""Testing parameter space samplers."""
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig.samplers import sample_points
+
+
+def test_sobol():
+    """Test the first points of the Sobol sequence."""
+    parameters = {'a': pc.Range(0.0, 1.0), 'b': pc.Range(0.0, 1.0)}
+    points = list(sample_points(parameters, 'sobol', 4))
+    assert points == [(0.0, 0.0), (0.5, 0.5), (0.75, 0.25), (0.25, 0.75)]
+
+
+def test_halton():
+    """Test the first points of the Halton sequence."""
+    parameters = {'a': pc.Range(0.0, 1.0), 'b': pc.Range(0.0, 1.0)}
+    points = list(sample_points(parameters, 'halton', 3))
+    assert points == pytest.approx([(0.5, 1 / 3), (0.25, 2 / 3), (0.75, 1 / 9)])
+
+
+def test_latin_hypercube():
+    """Test that each stratum has exactly one point."""
+    parameters = {'a': pc.Range(0.0, 1.0), 'b': list(range(10))}
+    points = list(sample_points(parameters, 'latin_hypercube', 10, seed=1))
+    assert sorted(int(a * 10) for a, _ in points) == list(range(10))
+    assert sorted(b for _, b in points) == list(range(10))
+
+
+@pytest.mark.parametrize('sampler', ['random', 'latin_hypercube', 'sobol', 'halton'])
+def test_samplers(sampler):
+    """Test sampled values are in range and reproducible with a seed."""
+    parameters = {'a': pc.Range(-1.0, 1.0), 'b': pc.Range(1, 3), 'c': ['x', 'y']}
+    points = list(sample_points(parameters, sampler, 50, seed=42))
+    assert len(points) == 50
+    assert points == list(sample_points(parameters, sampler, 50, seed=42))
+    for a, b, c in points:
+        assert isinstance(a, float) and -1.0 <= a < 1.0
+        assert isinstance(b, int) and 1 <= b <= 3
+        assert c in ('x', 'y')
@@ -0,0 +1,54 @@
+"""Testing the variable type schema."""
+
+import datetime
+import pathlib
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig import schema
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def _write_config(path, lines):
+    path.write_text('# header\n\n# block\n' + ''.join(lines))
+
+
+def test_schema_types(tmp_path):
+    """Test parsing values with the schema types."""
+    _write_config(
+        tmp_path / 'config.in',
+        [
+            '    dumpfile =      00100   ! dump file\n',
+            '        tmax =          1   ! end time\n',
+            '   nfulldump = not_an_int   ! full dump frequency\n',
+            '    new_file =      00100   ! not in schema\n',
+        ],
+    )
+    conf = pc.read_config(tmp_path / 'config.in')
+    assert conf.get_value('dumpfile') == '00100'
+    assert conf.get_value('tmax') == 1.0
+    assert isinstance(conf.get_value('tmax'), float)
+    assert conf.get_value('nfulldump') == 'not_an_int'
+    assert conf.get_value('new_file') == 100
+
+
+def test_schema_register_and_learn(tmp_path):
+    """Test extending the schema."""
+    try:
+        schema.register({'new_file': str})
+        assert schema.get_type('new_file') is str
+        with pytest.raises(ValueError):
+            schema.register({'new_list': list})
+
+        conf = pc.read_config(test_phantom_file)
+        conf.add_variable('new_time', datetime.timedelta(hours=1), block='block')
+        schema.learn(conf)
+        assert schema.get_type('new_time') is datetime.timedelta
+
+        schema.unregister(['new_file'])
+        assert schema.get_type('new_file') is None
+    finally:
+        schema.reset()
+    assert schema.get_schema() == schema.DEFAULT_SCHEMA
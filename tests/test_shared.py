@@ -0,0 +1,73 @@
+"""Testing sharing configs through shared memory."""
+
+import multiprocessing
+import pathlib
+import sys
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig import shared as _shared
+from phantomconfig.shared import SharedConfigs, load_shared, release_shared
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 8), reason='requires multiprocessing.shared_memory'
+)
+
+
+def _get_alpha(handle):
+    return load_shared(handle).get_value('alpha')
+
+
+def _load_cached(handle):
+    load_shared(handle)
+    attached = list(_shared._attached)
+    alpha = load_shared(handle).get_value('alpha')
+    release_shared()
+    return attached == [handle.name] and not _shared._attached, alpha
+
+
+def _closed(buf):
+    try:
+        buf.nbytes
+    except ValueError:
+        return True
+    return False
+
+
+def _release_during_load(handle):
+    load_shared(handle)
+    attachment = _shared._attached[handle.name]
+    with _shared._attach_lock:
+        attachment.readers += 1
+    release_shared(handle.name)
+    deferred = not _closed(attachment.buf)
+    _shared._finish_read(attachment)
+    return deferred, _closed(attachment.buf)
+
+
+def test_shared_configs():
+    """Test loading shared configs in worker processes."""
+    configs = list()
+    for alpha in [0.1, 0.2, 0.3]:
+        conf = pc.read_config(test_phantom_file)
+        conf.change_value('alpha', alpha)
+        configs.append(conf)
+
+    with SharedConfigs(configs) as shared:
+        assert len(shared) == 3
+        assert load_shared(shared[1]) == configs[1]
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(2) as pool:
+            assert pool.map(_get_alpha, shared.handles) == [0.1, 0.2, 0.3]
+            assert pool.map(_load_cached, shared.handles) == [
+                (True, 0.1),
+                (True, 0.2),
+                (True, 0.3),
+            ]
+            assert pool.apply(_release_during_load, (shared[0],)) == (True, True)
+
+    with pytest.raises(FileNotFoundError):
+        load_shared(shared[0])
@@ -0,0 +1,65 @@
+"""Testing immutable snapshots."""
+
+import pathlib
+import pickle
+import threading
+
+import pytest
+
+import phantomconfig as pc
+from phantomconfig.snapshot import ConfigSnapshot
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def test_snapshot():
+    """Test that changes to snapshots return new snapshots."""
+    conf = pc.read_config(test_phantom_file)
+    snapshot = conf.snapshot()
+    assert isinstance(snapshot, ConfigSnapshot)
+    assert dict(snapshot) == conf.config
+    assert snapshot.header == tuple(conf.header)
+
+    conf.change_value('tmax', 1.0)
+    assert snapshot.get_value('tmax') == 100.0
+
+    changed = snapshot.change_value('tmax', 200.0).remove_variable('dtmax')
+    changed = changed.add_variable('new', 1)
+    assert snapshot.get_value('tmax') == 100.0
+    assert changed.get_value('tmax') == 200.0
+    assert 'dtmax' in snapshot and 'dtmax' not in changed
+    assert len(changed) == len(snapshot)
+    assert changed.variables[-1] == 'new'
+    assert changed.variables[:2] == snapshot.variables[:2]
+
+    with pytest.raises(ValueError):
+        snapshot.change_value('tmax', 'long')
+    with pytest.raises(AttributeError):
+        snapshot.header = None
+
+    config = changed.to_config()
+    assert config.config == dict(changed)
+    config.change_value('tmax', 300.0)
+    assert changed.get_value('tmax') == 200.0
+
+    assert dict(pickle.loads(pickle.dumps(changed))) == dict(changed)
+
+
+def test_snapshot_many_changes():
+    """Test many changes from one snapshot in threads."""
+    snapshot = pc.read_config(test_phantom_file).snapshot()
+    results = dict()
+
+    def worker(idx):
+        changed = snapshot
+        for step in range(100):
+            changed = changed.change_value('nfulldump', idx * 1000 + step)
+        results[idx] = changed.get_value('nfulldump')
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {idx: idx * 1000 + 99 for idx in range(4)}
+    assert snapshot.get_value('nfulldump') == 10
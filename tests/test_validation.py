@@ -0,0 +1,66 @@
+"""Testing validation of many points."""
+
+import pytest
+
+from phantomconfig.validation import Validator
+
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_validator(use_numpy):
+    """Test validating points."""
+    if use_numpy:
+        pytest.importorskip('numpy')
+    validator = Validator(
+        ranges={'alpha': (0.0, 1.0)},
+        allowed={'ieos': [1, 2, 3]},
+        relations=['tmax >= dtmax', 'alpha < 0.5 or tmax > 5'],
+        use_numpy=use_numpy,
+    )
+    points = {'alpha': [0.1, 2.0, 0.7, 0.2], 'tmax': [1.0, 10.0, 1.0, 0.01]}
+    mask, errors = validator.validate(points, defaults={'ieos': 1, 'dtmax': 0.1})
+    assert list(mask) == [True, False, False, False]
+    assert [index for index, _ in errors] == [1, 2, 3]
+    assert 'alpha=2.0' in errors[0][1]
+
+    mask, errors = validator.validate(
+        [{'nfulldump': 1.0, 'tmax': 1.0}], defaults={'ieos': 4}
+    )
+    assert list(mask) == [False]
+    assert len(errors) == 2
+
+    mask, errors = Validator(types={'nfulldump': int}, use_numpy=use_numpy).validate(
+        {'nfulldump': [True, False]}
+    )
+    assert list(mask) == [True, True]
+
+    with pytest.raises(ValueError):
+        validator.check(points, defaults={'ieos': 1, 'dtmax': 0.1})
+    validator.check({'alpha': [0.1]}, defaults={'ieos': 1})
+
+
+def test_validator_functions():
+    """Test that relations give the same result with and without numpy."""
+    pytest.importorskip('numpy')
+    relations = [
+        'max(a, b, c) >= 10',
+        'min(a, b, c) <= 2',
+        'log(c, 10) < 0.9',
+        'a / (b - 5) > 0',
+    ]
+    points = {'a': [1.0, 2.0, 3.0], 'b': [5.0, 6.0, 1.0], 'c': [10.0, 1.0, 7.0]}
+    for relation in relations[:3]:
+        results = [
+            list(
+                Validator(relations=[relation], use_numpy=use_numpy).validate(points)[0]
+            )
+            for use_numpy in (True, False)
+        ]
+        assert results[0] == results[1], relation
+    assert [
+        list(Validator(relations=relations[:1], use_numpy=True).validate(points)[0])
+    ] == [[True, False, False]]
+
+    # Division by zero raises with and without numpy.
+    for use_numpy in (True, False):
+        with pytest.raises(ZeroDivisionError):
+            Validator(relations=relations[3:], use_numpy=use_numpy).validate(points)
@@ -0,0 +1,77 @@
+"""Testing watching config files."""
+
+import os
+import pathlib
+import shutil
+import threading
+
+import phantomconfig as pc
+from phantomconfig.watch import ConfigWatcher, watch
+
+test_phantom_file = pathlib.Path(__file__).parent / 'stub' / 'config.in'
+
+
+def _edit(path, variable, value, mtime):
+    conf = pc.read_config(path)
+    conf.change_value(variable, value)
+    tmp_path = path.with_suffix('.tmp')
+    conf.write_phantom(tmp_path)
+    os.utime(tmp_path, (mtime, mtime))
+    os.replace(tmp_path, path)
+
+
+def test_config_watcher(tmp_path):
+    """Test polling for changed config files."""
+    (tmp_path / 'run1').mkdir()
+    shutil.copy(test_phantom_file, tmp_path / 'run1' / 'config.in')
+    watcher = ConfigWatcher([tmp_path], use_inotify=False)
+    assert len(watcher.configs) == 1
+    assert watcher.poll() == []
+
+    _edit(tmp_path / 'run1' / 'config.in', 'tmax', 200.0, 1e9)
+    (changed,) = watcher.poll()
+    assert changed.config.get_value('tmax') == 200.0
+    assert changed.diff == {'tmax': (100.0, 200.0)}
+    assert watcher.poll() == []
+
+    (tmp_path / 'run2').mkdir()
+    shutil.copy(test_phantom_file, tmp_path / 'run2' / 'config.in')
+    (tmp_path / 'run1' / 'config.in').unlink()
+    changes = {change.path.parent.name: change for change in watcher.poll()}
+    assert changes['run1'].config is None
+    assert changes['run1'].diff['tmax'] == (200.0, None)
+    assert changes['run2'].config.get_value('tmax') == 100.0
+
+    (tmp_path / 'run3').mkdir()
+    (tmp_path / 'run3' / 'config.in').touch()
+    assert watcher.poll() == []
+
+
+def test_watch(tmp_path):
+    """Test calling a function on changes."""
+    shutil.copy(test_phantom_file, tmp_path / 'config.in')
+    stop = threading.Event()
+    changes = list()
+
+    def callback(change):
+        changes.append(change)
+        stop.set()
+
+    edit = threading.Timer(
+        0.2, _edit, args=(tmp_path / 'config.in', 'nfulldump', 5, 1e9)
+    )
+    timeout = threading.Timer(10.0, stop.set)
+    edit.start()
+    timeout.start()
+    try:
+        watch(
+            [tmp_path / 'config.in'],
+            callback,
+            interval=0.01,
+            stop=stop,
+            use_inotify=False,
+        )
+    finally:
+        edit.cancel()
+        timeout.cancel()
+    assert changes[0].diff == {'nfulldump': (10, 5)}